@@ -2,7 +2,7 @@ import streamlit as st
 import uuid
 import threading
 import time
-from main import call_agent, runner, APP_NAME, USER_ID
+from main import stream_agent, runner, APP_NAME
 
 # Page configuration
 st.set_page_config(
@@ -12,6 +12,10 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Give each visitor their own user ID so sessions and conversation memory are partitioned per student
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = f"visitor-{uuid.uuid4()}"
+
 # Initialize system status in session state
 if 'system_initialized' not in st.session_state:
     st.session_state.system_initialized = False
@@ -398,7 +402,7 @@ with st.sidebar:
         <div style="background: #f1f5f9; padding: 1rem; border-radius: 8px;">
             <p style="margin: 0; font-size: 0.8rem; color: #64748b;">
                 <strong>App:</strong> {APP_NAME}<br/>
-                <strong>User ID:</strong> {USER_ID}<br/>
+                <strong>User ID:</strong> {st.session_state.user_id[:16]}...<br/>
                 <strong>Status:</strong> <span style="color: #16a34a;">{"Online" if st.session_state.system_initialized else "Offline"}</span>
             </p>
         </div>
@@ -533,14 +537,31 @@ if prompt := st.chat_input("💬 Ask me anything about admissions, programs, or
     with st.chat_message("user", avatar="👤"):
         st.markdown(prompt)
 
-    # Get AI response with enhanced loading
+    # Stream the AI response as it is generated
     with st.chat_message("assistant", avatar="🤖"):
-        with st.spinner("🧠 AI is thinking... Processing your request"):
-            response = call_agent(prompt, st.session_state.session_id)
+        status = st.empty()
+        status.caption("🧠 AI is thinking... Processing your request")
+
+        def response_chunks():
+            last_author = None
+            for item in stream_agent(prompt, st.session_state.session_id, user_id=st.session_state.user_id):
+                if item["type"] == "transfer":
+                    agent_name = item["agent"].replace("_", " ").title()
+                    status.caption(f"🔀 Handing over to {agent_name}...")
+                    continue
+
+                status.empty()
+                # Start a new paragraph when a different agent starts talking
+                if last_author is not None and item["agent"] != last_author:
+                    yield "\n\n"
+                last_author = item["agent"]
+                yield item["text"]
+
+        response = st.write_stream(response_chunks())
+        status.empty()
 
         if response:
             st.session_state.history.append({"role": "assistant", "content": response})
-            st.markdown(response)
         else:
             error_message = "I apologize, but I encountered an issue. Please try rephrasing your question or check your connection."
             st.session_state.history.append({"role": "assistant", "content": error_message})
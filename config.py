@@ -21,9 +21,79 @@ GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
 # Vector Database Configuration
 EMBEDDING_CONFIG = {
     "api_key": os.getenv("EMBEDDING_MODEL_API"),
+    "model": "BAAI/bge-large-en-v1.5",
     "api_url": "https://api.deepinfra.com/v1/inference/BAAI/bge-large-en-v1.5",
     "timeout": 30,
-    "dimensions": 1024  # BGE Large model dimensions
+    "dimensions": 1024,  # BGE Large model dimensions
+    "batch_size": 32,  # Texts sent per embedding request by generate_embeddings
+    "pool_size": int(os.getenv("EMBEDDING_POOL_SIZE", "20")),  # Max open connections to the embedding API
+    "keepalive_timeout": 60  # Seconds an idle pooled connection is kept open
+}
+
+# Vector store backend used by tools.vector: "qdrant" (remote collection) or
+# "local" (in-process NumPy index, no network hops - suited to small knowledge bases)
+VECTOR_STORE_CONFIG = {
+    "backend": os.getenv("VECTOR_STORE_BACKEND", "qdrant").lower(),
+    "local_index_path": os.getenv(
+        "LOCAL_INDEX_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "local_index")
+    ),
+    "mmap": True,  # Memory-map the saved index instead of reading it into memory
+    # Snapshot of the collection written by data/ingest_documents.py and loaded at
+    # startup as a warm local index / fallback when Qdrant is slow or unreachable
+    "snapshot_path": os.getenv(
+        "VECTOR_SNAPSHOT_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "snapshot")
+    ),
+    "snapshot_dtype": "float16",
+    "fallback_timeout": 2.0  # Seconds to wait for Qdrant before answering from the snapshot
+}
+
+# Query embedding cache used by tools.vector.generate_embedding
+EMBEDDING_CACHE_CONFIG = {
+    "enabled": os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true",
+    "max_entries": 2048,  # In-process LRU size
+    "ttl_seconds": 7 * 24 * 3600,  # Embeddings only change if the model changes
+    "persist_path": os.getenv("EMBEDDING_CACHE_PATH")  # Optional SQLite file for on-disk persistence
+}
+
+# Search result cache used by tools.rag_tool.search_course_documents.
+# Entries are keyed on the collection version, which ingestion bumps by
+# rewriting version_file, so every process drops stale results after a re-index.
+SEARCH_CACHE_CONFIG = {
+    "enabled": os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true",
+    "max_entries": 512,
+    "ttl_seconds": 3600,  # Upper bound on staleness if the version file is not shared
+    "version_file": os.getenv(
+        "COLLECTION_VERSION_FILE",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", ".collection_version")
+    )
+}
+
+# Bulk ingestion settings used by tools.vector.upsert_document_chunks
+INGESTION_CONFIG = {
+    "upsert_batch_size": 64,  # Points written per Qdrant upsert request
+    "max_concurrency": 4  # Batches embedded/upserted in parallel
+}
+
+# JSON serialisation used by tools.serialization for stored user data and tool outputs.
+# Compact output drops indentation and spaces after separators, which shrinks the
+# user data files and the tool responses fed back into the LLM context.
+SERIALIZATION_CONFIG = {
+    "compact": os.getenv("SERIALIZATION_COMPACT", "true").lower() == "true",
+    "use_orjson": os.getenv("SERIALIZATION_USE_ORJSON", "true").lower() == "true"  # Used only if installed
+}
+
+# Conversation memory used by tools.memory_service.IncrementalMemoryService.
+# "bm25" keeps a per-user inverted index so a search only touches turns that
+# contain a query term; "keyword" is the original scan of every stored turn.
+MEMORY_CONFIG = {
+    "backend": os.getenv("MEMORY_BACKEND", "bm25").lower(),
+    "max_results": 10,  # Memories returned per search (bm25 / vector only)
+    "bm25_k1": 1.5,
+    "bm25_b": 0.75,
+    # Also embed each turn and fuse cosine results with BM25 (costs one embedding request per turn)
+    "vector_search": os.getenv("MEMORY_VECTOR_SEARCH", "false").lower() == "true"
 }
 
 # Debug: Check if embedding API key is loaded
@@ -84,6 +154,10 @@ AGENT_CONFIG = {
     "max_tokens": 8192,
 }
 
+# User ID for callers without a per-visitor identity (CLI, scripts). The web app
+# generates one ID per visitor so sessions and memory are partitioned by student.
+DEFAULT_USER_ID = "user123"
+
 # Onboarding Stages
 ONBOARDING_STAGES = [
     "greeting",
@@ -0,0 +1,298 @@
+"""
+Serialisation Benchmark for Tool Outputs and Stored User Data
+
+This script compares the original indent=2 JSON with the compact serialisation
+in tools/serialization.py on representative payloads: a user profile, an
+update result, a course search result and a conversation memory result. It
+reports bytes, estimated tokens and encode time per payload, and the size of a
+1,000-applicant data file.
+
+dumps() only produces the stored user data and the strings returned by the
+*_sync tool wrappers. The async tools registered on agents return dicts that
+ADK serialises itself, so indent=2 vs compact makes no difference to what the
+model sees. For those, the last section measures what the tools now trim
+instead: unfilled fields and completeness bookkeeping in a get_user_data
+profile, sized as compact JSON (an approximation of ADK's own encoding).
+
+Token counts use tiktoken (cl100k_base) when installed, otherwise the common
+estimate of 4 characters per token.
+"""
+
+import copy
+import json
+import sys
+import timeit
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from tools.serialization import drop_nulls, dumps, orjson
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _encoding = None
+
+def estimate_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+def sample_user_profile() -> dict:
+    return {
+        "success": True,
+        "user_exists": True,
+        "user_data": {
+            "personal_info": {
+                "full_name": "Priya Raghunathan",
+                "phone_number": "9876543210",
+                "email": "priya.r@example.com",
+                "date_of_birth": "2002-08-14",
+                "address": "12 Lake View Road, Kochi, Kerala 682001"
+            },
+            "academic_background": {
+                "highest_qualification": "Bachelor of Commerce",
+                "institution": "St. Teresa's College",
+                "graduation_year": "2023",
+                "percentage_cgpa": "8.4 CGPA",
+                "field_of_study": "Finance"
+            },
+            "program_preferences": {
+                "interested_programs": ["MBA", "PG Diploma in Data Analytics"],
+                "preferred_start_date": "2025-07",
+                "study_mode": "full-time",
+                "budget_range": "5-8 lakh"
+            },
+            "eligibility_status": {
+                "programs_eligible_for": ["MBA"],
+                "documents_verified": True,
+                "eligibility_checked": True
+            },
+            "application_status": {
+                "current_stage": "fee_calculation",
+                "documents_submitted": ["transcript", "id_card"],
+                "payment_status": "pending"
+            },
+            "_metadata": {
+                "created_at": "2025-01-10T10:15:30.123456",
+                "last_updated": "2025-01-10T10:42:07.654321",
+                "version": 14,
+                "last_updated_by": "eligibility_checker",
+                "completeness_mask": 262143,
+                "completeness_schema": 1234567890
+            }
+        },
+        "completeness_score": 1.0,
+        "total_fields": 18,
+        "completed_fields": 18,
+        "missing_fields": []
+    }
+
+
+def sample_partial_profile() -> dict:
+    """A get_user_data result early in onboarding, as returned before unfilled fields were trimmed."""
+    return {
+        "success": True,
+        "user_exists": True,
+        "user_data": {
+            "personal_info": {
+                "full_name": "Priya Raghunathan",
+                "phone_number": "9876543210",
+                "email": None,
+                "date_of_birth": None,
+                "address": None
+            },
+            "academic_background": {
+                "highest_qualification": "Bachelor of Commerce",
+                "institution": None,
+                "graduation_year": None,
+                "percentage_cgpa": None,
+                "field_of_study": None
+            },
+            "program_preferences": {
+                "interested_programs": ["MBA"],
+                "preferred_start_date": None,
+                "study_mode": None,
+                "budget_range": None
+            },
+            "eligibility_status": {
+                "programs_eligible_for": [],
+                "documents_verified": False,
+                "eligibility_checked": False
+            },
+            "application_status": {
+                "current_stage": "data_collection",
+                "documents_submitted": [],
+                "payment_status": "pending"
+            },
+            "_metadata": {
+                "created_at": "2025-01-10T10:15:30.123456",
+                "last_updated": "2025-01-10T10:16:02.654321",
+                "version": 4,
+                "last_updated_by": "registration_concierge",
+                "completeness_mask": 7233,
+                "completeness_schema": 1234567890
+            }
+        },
+        "completeness_score": 0.33,
+        "total_fields": 18,
+        "completed_fields": 6,
+        "missing_fields": [
+            "personal_info.email",
+            "personal_info.date_of_birth",
+            "personal_info.address",
+            "academic_background.institution",
+            "academic_background.graduation_year",
+            "academic_background.percentage_cgpa",
+            "academic_background.field_of_study",
+            "program_preferences.preferred_start_date",
+            "program_preferences.study_mode",
+            "program_preferences.budget_range",
+            "eligibility_status.programs_eligible_for",
+            "application_status.documents_submitted"
+        ]
+    }
+
+
+def trimmed_profile(result: dict) -> dict:
+    """The same result as get_user_data now returns it to agents."""
+    result = copy.deepcopy(result)
+    for key in ("completeness_mask", "completeness_schema"):
+        result["user_data"]["_metadata"].pop(key, None)
+    result["user_data"] = drop_nulls(result["user_data"])
+    return result
+
+
+def sample_update_result() -> dict:
+    return {
+        "success": True,
+        "user_exists": True,
+        "fields_updated": ["program_preferences.study_mode"],
+        "completeness_score": 0.72,
+        "total_fields": 18,
+        "completed_fields": 13,
+        "missing_fields": [
+            "personal_info.date_of_birth",
+            "personal_info.address",
+            "program_preferences.budget_range",
+            "eligibility_status.programs_eligible_for",
+            "application_status.documents_submitted"
+        ]
+    }
+
+
+def sample_search_result() -> dict:
+    content = (
+        "The MBA programme runs for two years across four semesters with core modules in "
+        "finance, marketing, operations and strategy, followed by electives and a capstone "
+        "project. Applicants need a bachelor's degree with at least 50% aggregate marks and a "
+        "valid entrance test score. Tuition is payable per semester with scholarships available "
+        "for merit and need-based categories. "
+    ) * 2
+    documents = [
+        {
+            "content": content,
+            "course_name": "Master of Business Administration",
+            "level": "pg",
+            "type": "overview",
+            "source_file": "mba_programme.docx",
+            "relevance_score": round(0.82 - i * 0.03, 3),
+            "chunk_id": f"mba_programme_{i}"
+        }
+        for i in range(5)
+    ]
+    return {
+        "status": "success",
+        "query_used": "MBA admission requirements and fees",
+        "filters_used": {"level": ["pg", "general"]},
+        "documents": documents,
+        "total_found": len(documents),
+        "cached": False
+    }
+
+
+def sample_memory_result() -> dict:
+    return {
+        "status": "success",
+        "query": "academic qualification",
+        "memories": [
+            {
+                "content": "I finished my B.Com from St. Teresa's College in 2023 with 8.4 CGPA.",
+                "author": "user",
+                "timestamp": 1736504130.12
+            }
+            for _ in range(3)
+        ],
+        "total_found": 3
+    }
+
+
+def measure(name: str, payload: dict) -> dict:
+    variants = {
+        "indent=2": lambda: json.dumps(payload, indent=2),
+        "compact": lambda: dumps(payload, compact=True)
+    }
+    row = {"payload": name}
+    for label, encode in variants.items():
+        text = encode()
+        seconds = min(timeit.repeat(encode, number=200, repeat=3)) / 200
+        row[label] = {
+            "bytes": len(text.encode("utf-8")),
+            "tokens": estimate_tokens(text),
+            "encode_us": seconds * 1e6
+        }
+    return row
+
+
+def main():
+    print("📏 Serialisation Benchmark")
+    print(f"   Encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json'} (compact mode)")
+    print(f"   Tokens:  {'tiktoken cl100k_base' if _encoding else 'estimated at 4 chars/token'}")
+    print("=" * 78)
+    print("Stored data and *_sync wrapper output (not what agents see)")
+    print(f"{'payload':<26}{'bytes':>16}{'tokens':>16}{'encode µs':>20}")
+    print("   (each column: indent=2 → compact)")
+    print("-" * 78)
+
+    payloads = {
+        "get_user_data": sample_user_profile(),
+        "update_user_data": sample_update_result(),
+        "search_course_documents": sample_search_result(),
+        "search_conversation_memory": sample_memory_result()
+    }
+
+    rows = {name: measure(name, payload) for name, payload in payloads.items()}
+    for name, row in rows.items():
+        before, after = row["indent=2"], row["compact"]
+        print(
+            f"{name:<26}"
+            f"{before['bytes']:>7} → {after['bytes']:<6}"
+            f"{before['tokens']:>7} → {after['tokens']:<6}"
+            f"{before['encode_us']:>10.1f} → {after['encode_us']:<7.1f}"
+        )
+
+    # Stored data file for 1,000 applicants
+    profile = sample_user_profile()["user_data"]
+    all_users = {f"98765{i:05d}": profile for i in range(1000)}
+    before = len(json.dumps(all_users, indent=2).encode("utf-8"))
+    after = len(dumps(all_users, compact=True).encode("utf-8"))
+    print("-" * 78)
+    print(f"user_data.json with 1,000 applicants: {before / 1024:.0f} KB → {after / 1024:.0f} KB "
+          f"({1 - after / before:.0%} smaller)")
+
+    # Dict payload an agent receives from get_user_data, before and after trimming
+    print("=" * 78)
+    print("get_user_data dict returned to agents (sized as compact JSON)")
+    original = dumps(sample_partial_profile(), compact=True)
+    trimmed = dumps(trimmed_profile(sample_partial_profile()), compact=True)
+    before, after = len(original.encode("utf-8")), len(trimmed.encode("utf-8"))
+    saved_tokens = estimate_tokens(original) - estimate_tokens(trimmed)
+    print(f"   bytes:  {before} → {after} ({1 - after / before:.0%} smaller)")
+    print(f"   tokens: {estimate_tokens(original)} → {estimate_tokens(trimmed)} ({saved_tokens} fewer per call)")
+
+
+if __name__ == "__main__":
+    main()
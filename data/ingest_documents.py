@@ -15,11 +15,15 @@ from typing import List, Dict, Any
 sys.path.append(str(Path(__file__).parent.parent))
 
 from tools.vector import (
-    initialize_collection, 
-    add_document_chunk, 
+    ensure_collection,
+    upsert_document_chunks,
     health_check,
-    search_similar_chunks
+    search_similar_chunks,
+    save_snapshot,
+    close_embedding_client
 )
+from tools.local_index import LocalVectorIndex
+from config import EMBEDDING_CONFIG
 
 class ConsolidatedKnowledgeBaseParser:
     """Handles parsing of the consolidated knowledge base file with larger chunks."""
@@ -31,6 +35,8 @@ class ConsolidatedKnowledgeBaseParser:
             "chunks_parsed": 0,
             "chunks_stored": 0,
             "total_characters": 0,
+            "batch_timings": [],
+            "storage_seconds": 0.0,
             "errors": []
         }
     
@@ -112,37 +118,56 @@ class ConsolidatedKnowledgeBaseParser:
         }
     
     async def store_chunks_in_vector_db(self, chunks: List[Dict[str, Any]]) -> None:
-        """Store all parsed chunks in the vector database."""
+        """Store all parsed chunks in the vector database using batched embedding and upserts."""
         print(f"\n💾 Storing {len(chunks)} consolidated chunks in vector database...")
         
-        for chunk in chunks:
+        # Prepare chunk text with title and content
+        documents = [
+            {
+                "text": f"{chunk['course_name']} - {chunk['type'].title()}\n\n{chunk['content']}",
+                "course_name": chunk['course_name'],
+                "chunk_id": chunk['chunk_id'],
+                "level": chunk['level'],
+                "chunk_type": chunk['type']
+            }
+            for chunk in chunks
+        ]
+        
+        # Mirror stored points into a local index so we can write a cold-start snapshot
+        snapshot_index = LocalVectorIndex(EMBEDDING_CONFIG["dimensions"])
+        
+        try:
+            result = await upsert_document_chunks(documents, mirror=snapshot_index)
+        except Exception as e:
+            error_msg = f"Exception storing chunks: {e}"
+            self.ingestion_stats["errors"].append(error_msg)
+            print(f"   ⚠️ {error_msg}")
+            return
+        
+        self.ingestion_stats["chunks_stored"] += result["stored"]
+        self.ingestion_stats["batch_timings"].extend(result["batches"])
+        self.ingestion_stats["storage_seconds"] += result["total_seconds"]
+        
+        for timing in result["batches"]:
+            print(f"   ✅ Batch {timing['batch']}: stored {timing['stored']}/{timing['size']} chunks "
+                  f"(embed {timing['embed_seconds']:.2f}s, upsert {timing['upsert_seconds']:.2f}s)")
+        
+        for index in result["failed"]:
+            chunk = chunks[index]
+            error_msg = f"Failed to store Chunk {chunk['chunk_number']}: {chunk['course_name']} ({chunk['type']})"
+            self.ingestion_stats["errors"].append(error_msg)
+            print(f"   ❌ {error_msg}")
+        
+        if len(snapshot_index):
             try:
-                # Prepare chunk text with title and content
-                full_text = f"{chunk['course_name']} - {chunk['type'].title()}\n\n{chunk['content']}"
-                
-                success = await add_document_chunk(
-                    text=full_text,
-                    course_name=chunk['course_name'],
-                    chunk_id=chunk['chunk_id'],
-                    level=chunk['level'],
-                    chunk_type=chunk['type']
-                )
-                
-                if success:
-                    self.ingestion_stats["chunks_stored"] += 1
-                    estimated_tokens = len(full_text) // 3.5
-                    print(f"   ✅ Stored Chunk {chunk['chunk_number']}: {chunk['course_name']} ({chunk['type']}) (~{estimated_tokens:.0f} tokens)")
-                else:
-                    error_msg = f"Failed to store Chunk {chunk['chunk_number']}: {chunk['course_name']} ({chunk['type']})"
-                    self.ingestion_stats["errors"].append(error_msg)
-                    print(f"   ❌ {error_msg}")
-                    
+                save_snapshot(snapshot_index)
+                print(f"   📸 Wrote local snapshot of {len(snapshot_index)} vectors for fast cold start")
             except Exception as e:
-                error_msg = f"Exception storing Chunk {chunk['chunk_number']}: {e}"
+                error_msg = f"Failed to write local snapshot: {e}"
                 self.ingestion_stats["errors"].append(error_msg)
                 print(f"   ⚠️ {error_msg}")
         
-        print(f"\n✅ Vector database storage completed!")
+        print(f"\n✅ Vector database storage completed in {result['total_seconds']:.2f}s!")
     
     def print_ingestion_summary(self) -> None:
         """Print a comprehensive summary of the ingestion process."""
@@ -152,6 +177,7 @@ class ConsolidatedKnowledgeBaseParser:
         print(f"Chunks Parsed: {self.ingestion_stats['chunks_parsed']}")
         print(f"Chunks Stored: {self.ingestion_stats['chunks_stored']}")
         print(f"Total Characters: {self.ingestion_stats['total_characters']:,}")
+        print(f"Storage Time: {self.ingestion_stats['storage_seconds']:.2f}s across {len(self.ingestion_stats['batch_timings'])} batches")
         
         if self.ingestion_stats["chunks_parsed"] > 0:
             avg_chunk_size = self.ingestion_stats["total_characters"] // self.ingestion_stats["chunks_parsed"]
@@ -227,7 +253,7 @@ async def main():
     print("🏥 Checking system health...")
     health_status = await health_check()
     
-    if not health_status.get("qdrant_connected", False):
+    if health_status.get("backend") == "qdrant" and not health_status.get("qdrant_connected", False):
         print("❌ Qdrant connection failed. Please check your configuration.")
         return
     
@@ -242,7 +268,7 @@ async def main():
     
     # Initialize vector database collection
     print("📦 Initializing vector database collection...")
-    collection_created = await initialize_collection()
+    collection_created = await ensure_collection()
     if not collection_created:
         print("❌ Failed to initialize collection. Exiting.")
         return
@@ -269,5 +295,12 @@ async def main():
     print(f"\n🎉 KDM Consolidated Knowledge Base ingestion completed successfully!")
     print(f"🤖 Your chatbot is now ready with comprehensive, token-optimized course information!")
 
+async def run():
+    """Run the ingestion and release the pooled embedding connections afterwards."""
+    try:
+        await main()
+    finally:
+        await close_embedding_client()
+
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(run())
@@ -13,7 +13,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from tools.rag_tool import search_course_documents, search_eligibility_requirements
-from tools.vector import health_check, search_similar_chunks
+from tools.vector import health_check, search_similar_chunks, close_embedding_client
 
 
 async def test_basic_search():
@@ -184,7 +184,7 @@ async def main():
     try:
         health = await health_check()
         
-        if not health['qdrant_connected']:
+        if health['backend'] == "qdrant" and not health['qdrant_connected']:
             print("❌ Qdrant not connected!")
             return
             
@@ -216,6 +216,8 @@ async def main():
     except Exception as e:
         print(f"\n💥 Test suite failed: {e}")
         raise
+    finally:
+        await close_embedding_client()
 
 
 if __name__ == "__main__":
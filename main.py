@@ -2,49 +2,57 @@ from google.genai import types
 from root_agent.agent import create_chatbot_agent
 from dotenv import load_dotenv
 from google.adk.runners import Runner
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.sessions import InMemorySessionService
-from google.adk.memory import InMemoryMemoryService
 import asyncio
 import tempfile
 import os
 from pathlib import Path
 from tools.file_parser import FileParserTool
 from tools.memory_tool import set_runner
+from tools.memory_service import IncrementalMemoryService
+from tools.event_loop import run_sync, iterate_sync
+from tools.vector import initialize_on_startup
+from config import DEFAULT_USER_ID
 
 load_dotenv()
 
 # --- Constants ---
 APP_NAME = "KDM_Student_Onboarding"
-USER_ID = "user123"  # A default user ID
+USER_ID = DEFAULT_USER_ID  # Default user ID for the CLI; app.py passes one per visitor
 
 # --- Agent and Runner Initialization ---
 # Create a single agent instance using the existing root agent
 chatbot_agent = create_chatbot_agent(USER_ID)
 
 # The Runner is the correct way to execute an ADK agent.
-# We use InMemorySessionService for session management and InMemoryMemoryService for conversation memory
+# We use InMemorySessionService for session management and IncrementalMemoryService for conversation memory
 runner = Runner(
     agent=chatbot_agent,
     app_name=APP_NAME,
     session_service=InMemorySessionService(),
-    memory_service=InMemoryMemoryService(),  # Enable conversation memory for context sharing
+    memory_service=IncrementalMemoryService(),  # Conversation memory that only ingests new events each turn
 )
 
 # Initialize memory tool with runner for agent access
 set_runner(runner)
 
-async def ensure_session_exists(session_id):
-    """Ensure session exists in the session service and add it to memory."""
+# Load the vector snapshot and bootstrap the collection at boot rather than on the first search
+run_sync(initialize_on_startup())
+
+async def ensure_session_exists(session_id, user_id=USER_ID):
+    """Ensure session exists in the session service and add its new events to memory."""
     try:
         session = await runner.session_service.get_session(
-            app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+            app_name=APP_NAME, user_id=user_id, session_id=session_id
         )
         if not session:
             session = await runner.session_service.create_session(
-                app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+                app_name=APP_NAME, user_id=user_id, session_id=session_id
             )
         
-        # Add session to memory service for context sharing between agents
+        # Add events since the last turn to memory for context sharing between agents
+        # (IncrementalMemoryService keeps a per-session watermark, so nothing is re-ingested)
         if runner.memory_service and session:
             await runner.memory_service.add_session_to_memory(session)
             
@@ -52,21 +60,21 @@ async def ensure_session_exists(session_id):
         print(f"Session creation error: {e}")
         # Create session anyway
         session = await runner.session_service.create_session(
-            app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+            app_name=APP_NAME, user_id=user_id, session_id=session_id
         )
         # Add to memory service
         if runner.memory_service and session:
             await runner.memory_service.add_session_to_memory(session)
 
-def call_agent(query, session_id, is_file=False):
-    """Calls the agent using the runner and returns the final response."""
+async def call_agent_async(query, session_id, is_file=False, user_id=USER_ID):
+    """Calls the agent on the running event loop and returns the final response."""
     try:
-        # Ensure session exists using async
-        asyncio.run(ensure_session_exists(session_id))
+        # Ensure session exists
+        await ensure_session_exists(session_id, user_id)
         
         if is_file:
-            # Handle file upload
-            processed_content = process_uploaded_file(query)
+            # Handle file upload (PDF parsing is blocking, so keep it off the event loop)
+            processed_content = await asyncio.to_thread(process_uploaded_file, query)
             if processed_content is None:
                 return "Sorry, I couldn't process the uploaded file. Please ensure it's a valid PDF."
             query_text = processed_content
@@ -76,9 +84,7 @@ def call_agent(query, session_id, is_file=False):
         content = types.Content(role="user", parts=[types.Part(text=query_text)])
         
         # The runner needs a user_id and session_id for its internal logic.
-        events = runner.run(user_id=USER_ID, session_id=session_id, new_message=content)
-
-        for event in events:
+        async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
             if event.is_final_response():
                 return event.content.parts[0].text
         return "Sorry, I couldn't get a response."
@@ -87,6 +93,73 @@ def call_agent(query, session_id, is_file=False):
         print(f"Error calling agent: {e}")
         return f"Sorry, I encountered an error: {e}"
 
+def call_agent(query, session_id, is_file=False, user_id=USER_ID):
+    """
+    Calls the agent from synchronous code (e.g. Streamlit) and returns the final response.
+    
+    Every turn runs on the same long-lived background event loop, so sessions, the
+    embedding HTTP pool, the Qdrant client and ADK internals are reused across turns
+    instead of being rebuilt by asyncio.run for each message.
+    """
+    return run_sync(call_agent_async(query, session_id, is_file, user_id))
+
+async def stream_agent_async(query, session_id, is_file=False, user_id=USER_ID):
+    """
+    Runs the agent with SSE streaming and yields response events as they arrive.
+    
+    Yields dicts of the form:
+        {"type": "text", "agent": <agent name>, "text": <new text chunk>}
+        {"type": "transfer", "agent": <agent taking over>}
+    """
+    try:
+        await ensure_session_exists(session_id, user_id)
+        
+        if is_file:
+            processed_content = await asyncio.to_thread(process_uploaded_file, query)
+            if processed_content is None:
+                yield {"type": "text", "agent": None, "text": "Sorry, I couldn't process the uploaded file. Please ensure it's a valid PDF."}
+                return
+            query_text = processed_content
+        else:
+            query_text = query
+        
+        content = types.Content(role="user", parts=[types.Part(text=query_text)])
+        run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+        
+        # With SSE the model's text arrives as partial events, followed by one
+        # non-partial event repeating the whole message; only text that was not
+        # already streamed is yielded from the non-partial event
+        streamed = False
+        async for event in runner.run_async(
+            user_id=user_id, session_id=session_id, new_message=content, run_config=run_config
+        ):
+            text = ""
+            if event.content and event.content.parts:
+                text = "".join(
+                    part.text for part in event.content.parts
+                    if part.text and not getattr(part, "thought", False)
+                )
+            
+            if event.partial:
+                if text:
+                    streamed = True
+                    yield {"type": "text", "agent": event.author, "text": text}
+                continue
+            
+            if text and not streamed:
+                yield {"type": "text", "agent": event.author, "text": text}
+            streamed = False
+            
+            if event.actions and event.actions.transfer_to_agent:
+                yield {"type": "transfer", "agent": event.actions.transfer_to_agent}
+    except Exception as e:
+        print(f"Error calling agent: {e}")
+        yield {"type": "text", "agent": None, "text": f"Sorry, I encountered an error: {e}"}
+
+def stream_agent(query, session_id, is_file=False, user_id=USER_ID):
+    """Synchronous generator over stream_agent_async, run on the shared background event loop."""
+    return iterate_sync(stream_agent_async(query, session_id, is_file, user_id))
+
 def process_uploaded_file(uploaded_file):
     """Process uploaded file and extract text content."""
     try:
@@ -14,7 +14,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 from config import get_gemini_model
 
 # Import user data management tools
-from tools.user_data_manager import update_user_data, get_user_data, get_required_data_schema
+from tools.user_data_manager import update_user_data, update_user_data_bulk, get_user_data, get_required_data_schema
 
 # Function to load prompt from file
 def load_prompt(prompt_file):
@@ -30,6 +30,6 @@ document_digitiser_agent = LlmAgent(
     model="gemini-2.5-flash", # LiteLlm configured Gemini 2.0 Flash model
     description="Expert document processing agent that extracts and validates student information from academic transcripts, certificates, and identification documents with intelligent data validation and user profile management.",
     instruction=load_prompt("document_digitiser.md"),
-    tools=[update_user_data, get_user_data, get_required_data_schema],
+    tools=[update_user_data, update_user_data_bulk, get_user_data, get_required_data_schema],
     include_contents='default'  # Include full conversation history for context sharing
 ) 
\ No newline at end of file
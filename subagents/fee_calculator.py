@@ -16,6 +16,9 @@ from config import get_gemini_model
 # Import user data management tools
 from tools.user_data_manager import update_user_data, get_user_data, get_required_data_schema
 
+# Import RAG tools
+from tools.rag_tool import search_course_documents
+
 # Function to load prompt from file
 def load_prompt(prompt_file):
     prompt_path = Path(__file__).parent.parent / "prompts" / prompt_file
@@ -30,6 +33,6 @@ fee_calculator_agent = LlmAgent(
     model="gemini-2.5-flash", # LiteLlm configured Gemini 2.0 Flash model
     description="Intelligent fee calculation agent that provides detailed cost breakdowns, scholarship assessments, and financial planning assistance for KDM programs with real-time data access and personalized recommendations.",
     instruction=load_prompt("fee_calculator.md"),
-    tools=[update_user_data, get_user_data, get_required_data_schema],
+    tools=[search_course_documents, update_user_data, get_user_data, get_required_data_schema],
     include_contents='default'  # Include full conversation history for context sharing
 ) 
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Tests for InterProcessLock acquisition while another process holds the lock file.
+"""
+
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from tools.locks import InterProcessLock, LockTimeoutError
+
+pytestmark = pytest.mark.skipif(platform.system() == "Windows", reason="flock waiter is Unix only")
+
+# Holds an exclusive flock on argv[1] until a line arrives on stdin
+HOLDER = """
+import fcntl, os, sys
+fd = os.open(sys.argv[1], os.O_RDWR | os.O_CREAT, 0o644)
+fcntl.flock(fd, fcntl.LOCK_EX)
+print("locked", flush=True)
+sys.stdin.readline()
+"""
+
+
+@pytest.fixture
+def lock_path(tmp_path):
+    return str(tmp_path / "user_data.lock")
+
+
+@pytest.fixture
+def holder(lock_path):
+    """A second process holding the lock file; call holder.release() to let it go."""
+    process = subprocess.Popen(
+        [sys.executable, "-c", HOLDER, lock_path],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    assert process.stdout.readline().strip() == "locked"
+
+    def release():
+        if process.poll() is None:
+            process.stdin.close()
+            process.wait(timeout=5)
+
+    process.release = release
+    yield process
+    release()
+
+
+def lock_is_free(lock_path):
+    """Whether a fresh process can take the lock file without blocking."""
+    code = (
+        "import fcntl, os, sys\n"
+        "fd = os.open(sys.argv[1], os.O_RDWR)\n"
+        "try:\n"
+        "    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)\n"
+        "except OSError:\n"
+        "    sys.exit(1)\n"
+    )
+    return subprocess.run([sys.executable, "-c", code, lock_path]).returncode == 0
+
+
+def test_acquire_times_out_while_another_process_holds_the_lock(lock_path, holder):
+    lock = InterProcessLock(lock_path)
+
+    start = time.monotonic()
+    with pytest.raises(LockTimeoutError):
+        lock.acquire(timeout=0.2)
+    assert 0.2 <= time.monotonic() - start < 2
+
+    stats = lock.stats.as_dict()
+    assert stats["timeouts"] == 1
+    assert stats["acquisitions"] == 0
+
+
+def test_acquire_succeeds_once_the_holder_releases(lock_path, holder):
+    lock = InterProcessLock(lock_path)
+    threading.Timer(0.2, holder.release).start()
+
+    lock.acquire(timeout=5)
+    try:
+        assert not lock_is_free(lock_path)
+    finally:
+        lock.release()
+
+    assert lock_is_free(lock_path)
+    assert lock.stats.as_dict()["contended"] == 1
+
+
+def test_timed_out_acquires_share_one_waiter_thread(lock_path, holder):
+    lock = InterProcessLock(lock_path)
+    threads_before = threading.active_count()
+
+    for _ in range(20):
+        with pytest.raises(LockTimeoutError):
+            lock.acquire(timeout=0.01)
+
+    assert threading.active_count() <= threads_before + 1
+
+
+def test_abandoned_late_acquisition_does_not_keep_the_lock(lock_path, holder):
+    lock = InterProcessLock(lock_path)
+    with pytest.raises(LockTimeoutError):
+        lock.acquire(timeout=0.1)
+
+    # The waiter left behind gets the file lock now, with nobody waiting for it
+    holder.release()
+    deadline = time.monotonic() + 5
+    while not lock_is_free(lock_path):
+        assert time.monotonic() < deadline, "abandoned waiter kept the lock file locked"
+        time.sleep(0.05)
+
+    # The lock itself is free again for this process
+    lock.acquire(timeout=1)
+    lock.release()
@@ -0,0 +1,51 @@
+"""
+Tests for how search_course_documents turns course names into payload filters.
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from tools.rag_tool import COURSE_NAMES, _build_filters, _resolve_course_names
+
+KNOWLEDGE_BASE = Path(__file__).parent.parent / "knowledge_base_courses.txt"
+
+
+def test_course_names_match_the_knowledge_base():
+    ingested = {
+        line.split(":", 1)[1].strip()
+        for line in KNOWLEDGE_BASE.read_text(encoding="utf-8").splitlines()
+        if line.startswith("course_name:")
+    }
+    assert set(COURSE_NAMES) == ingested
+
+
+def test_known_course_names_become_a_filter():
+    course_names, hints = _resolve_course_names("bachelor nursing, Master Business Administration MBA")
+    assert course_names == ["Bachelor Nursing", "Master Business Administration MBA"]
+    assert hints == []
+
+    filters = _build_filters("ug", "financial", tuple(course_names))
+    assert filters == {
+        "level": "ug",
+        "type": "financial",
+        "course_name": ("Bachelor Nursing", "Master Business Administration MBA")
+    }
+
+
+def test_unknown_names_fall_back_to_query_hints():
+    course_names, hints = _resolve_course_names("Data Science Masters, Bachelor Nursing")
+    assert course_names == ["Bachelor Nursing"]
+    assert hints == ["Data Science Masters"]
+
+
+def test_program_filter_is_a_filter_only_when_it_names_a_course():
+    assert _resolve_course_names("", "Bachelor Mechanical Engineering") == (["Bachelor Mechanical Engineering"], [])
+    assert _resolve_course_names("", "MBA") == ([], ["MBA"])
+    # An explicit course_name wins; a different known program_filter is kept as a hint
+    assert _resolve_course_names("Bachelor Nursing", "Bachelor Nursing") == (["Bachelor Nursing"], [])
+    assert _resolve_course_names("Bachelor Nursing", "Bachelor Mechanical Engineering") == (
+        ["Bachelor Nursing"], ["Bachelor Mechanical Engineering"]
+    )
@@ -0,0 +1,194 @@
+"""
+Tests for UserDataManager completeness tracking, bulk updates and the profiles it returns.
+
+The incremental completeness bitmap must always agree with the original
+recursive check over REQUIRED_USER_DATA, whatever sequence of field writes
+produced the record.
+"""
+
+import asyncio
+import copy
+import json
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """A JSON-backed manager whose data files live in a temporary directory."""
+    # Imported here so the module-level manager is also created in tmp_path
+    monkeypatch.chdir(tmp_path)
+    from tools.user_data_manager import UserDataManager
+    return UserDataManager("json")
+
+
+def reference_completeness(required, user_data):
+    """The recursive completeness check the bitmap replaced."""
+    def check_completeness(required, actual, path=""):
+        total_fields = 0
+        completed_fields = 0
+        missing_fields = []
+
+        for key, value in required.items():
+            current_path = f"{path}.{key}" if path else key
+
+            if isinstance(value, dict):
+                section = actual[key] if key in actual and isinstance(actual[key], dict) else {}
+                sub_total, sub_completed, sub_missing = check_completeness(value, section, current_path)
+                total_fields += sub_total
+                completed_fields += sub_completed
+                missing_fields.extend(sub_missing)
+            elif isinstance(value, list):
+                total_fields += 1
+                if key in actual and actual[key] and len(actual[key]) > 0:
+                    completed_fields += 1
+                else:
+                    missing_fields.append(current_path)
+            else:
+                total_fields += 1
+                if key in actual and actual[key] is not None and actual[key] != "":
+                    completed_fields += 1
+                else:
+                    missing_fields.append(current_path)
+
+        return total_fields, completed_fields, missing_fields
+
+    user_data_copy = {k: v for k, v in user_data.items() if not k.startswith('_')}
+    total, completed, missing = check_completeness(required, user_data_copy)
+    return {
+        "completeness_score": round(completed / total if total > 0 else 0, 2),
+        "total_fields": total,
+        "completed_fields": completed,
+        "missing_fields": missing
+    }
+
+
+def random_update(rng, required_paths, sections):
+    """Pick a field path and value covering leaf, section, nested and unrelated writes."""
+    values = [None, "", "value", 0, False, [], ["item"], {}, {"nested": "value"}]
+
+    def value():
+        # Fresh objects, as tool arguments parsed from JSON never alias each other
+        return copy.deepcopy(rng.choice(values))
+
+    kind = rng.random()
+    if kind < 0.6:
+        field_path = rng.choice(required_paths)
+    elif kind < 0.75:
+        field_path = rng.choice(sections)
+        section_fields = [path.split(".", 1)[1] for path in required_paths if path.startswith(field_path + ".")]
+        if rng.random() < 0.8:
+            return field_path, {
+                key: value() for key in rng.sample(section_fields, rng.randint(0, len(section_fields)))
+            }
+    elif kind < 0.9:
+        field_path = rng.choice(required_paths) + ".detail"
+    else:
+        field_path = rng.choice(["notes", "notes.extra", "user_profile.user_type"])
+    return field_path, value()
+
+
+def test_completeness_mask_matches_recursive_check(manager):
+    from tools.user_data_manager import REQUIRED_FIELD_PATHS, REQUIRED_USER_DATA
+
+    rng = random.Random(1234)
+    required_paths = [path for path, _ in REQUIRED_FIELD_PATHS]
+    sections = list(REQUIRED_USER_DATA.keys())
+
+    for _ in range(3000):
+        user_data = manager._initialize_user("9876543210")
+        manager._ensure_completeness_mask(user_data)
+
+        for _ in range(rng.randint(1, 12)):
+            before = copy.deepcopy(user_data)
+            field_path, value = random_update(rng, required_paths, sections)
+            try:
+                manager._set_nested_value(user_data, field_path, value)
+            except TypeError:
+                # Writing below a non-dict value fails the whole update
+                user_data = before
+                continue
+            manager._update_completeness_mask(user_data, field_path)
+
+        assert manager._calculate_completeness(user_data) == reference_completeness(REQUIRED_USER_DATA, user_data)
+
+
+def test_legacy_record_without_mask_is_scored(manager):
+    from tools.user_data_manager import REQUIRED_USER_DATA
+
+    user_data = {"personal_info": {"full_name": "Asha", "email": ""}, "academic_background": "n/a"}
+    assert manager._calculate_completeness(user_data) == reference_completeness(REQUIRED_USER_DATA, user_data)
+
+
+def test_get_user_data_hides_completeness_bookkeeping(manager):
+    result = manager.update_user_data_bulk(
+        "9876543210",
+        {"personal_info.full_name": "Asha Menon", "personal_info.email": "asha@example.com"},
+        "test_agent"
+    )
+    assert result["success"]
+
+    profile = manager.get_user_data("9876543210")
+    metadata = profile["user_data"]["_metadata"]
+    assert "completeness_mask" not in metadata
+    assert "completeness_schema" not in metadata
+    assert metadata["last_updated_by"] == "test_agent"
+    assert "personal_info.full_name" not in profile["missing_fields"]
+
+    # The stored record keeps its mask, so later reads are still scored from it
+    assert "completeness_mask" in manager.store.get("9876543210")["_metadata"]
+    assert manager.get_user_data("9876543210")["completed_fields"] == profile["completed_fields"]
+
+
+def test_agent_profile_omits_unfilled_fields(manager):
+    from tools.user_data_manager import _trim_profile
+
+    manager.update_user_data("9876543210", "personal_info.full_name", "Asha Menon", "test_agent")
+    profile = _trim_profile(manager.get_user_data("9876543210"))
+
+    assert profile["user_data"]["personal_info"] == {"full_name": "Asha Menon", "phone_number": "9876543210"}
+    assert "personal_info.email" in profile["missing_fields"]
+
+
+def test_bulk_tool_applies_all_fields_in_one_version_bump(manager, monkeypatch):
+    from tools import user_data_manager
+
+    monkeypatch.setattr(user_data_manager, "_user_data_manager", manager)
+    manager.update_user_data("9876543210", "personal_info.full_name", "Asha Menon", "test_agent")
+    version_before = manager.store.get("9876543210")["_metadata"]["version"]
+
+    updates = {
+        "personal_info.email": "asha@example.com",
+        "academic_background.highest_qualification": "B.Com",
+        "program_preferences.interested_programs": ["MBA"]
+    }
+    result = asyncio.run(user_data_manager.update_user_data_bulk("9876543210", json.dumps(updates), "document_digitiser"))
+
+    assert result["success"]
+    assert result["fields_updated"] == list(updates)
+    assert not set(updates) & set(result["missing_fields"])
+    assert result["completed_fields"] == manager.get_user_data("9876543210")["completed_fields"]
+
+    record = manager.store.get("9876543210")
+    assert record["_metadata"]["version"] == version_before + 1
+    assert record["_metadata"]["last_updated_by"] == "document_digitiser"
+    assert record["personal_info"]["email"] == "asha@example.com"
+    assert record["academic_background"]["highest_qualification"] == "B.Com"
+    assert record["program_preferences"]["interested_programs"] == ["MBA"]
+
+
+@pytest.mark.parametrize("updates_json", ["{not json", "[1, 2]", "\"text\""])
+def test_bulk_tool_rejects_non_object_json(manager, monkeypatch, updates_json):
+    from tools import user_data_manager
+
+    monkeypatch.setattr(user_data_manager, "_user_data_manager", manager)
+    result = asyncio.run(user_data_manager.update_user_data_bulk("9876543210", updates_json, "document_digitiser"))
+
+    assert not result["success"]
+    assert manager.store.get("9876543210") is None
@@ -0,0 +1,195 @@
+"""
+Tests for the user data storage backends' crash recovery and maintenance paths.
+"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from tools.user_data_store import JSONFileStore, ShardedFileStore, SQLiteStore, StoreCorruptedError
+
+
+def set_fields(changes):
+    """Return a mutator that writes changes ("section.field" paths) and bumps the record version."""
+    def mutate(user_data):
+        user_data = user_data or {"_metadata": {"version": 0}}
+        for field_path, value in changes.items():
+            section, key = field_path.split(".")
+            user_data.setdefault(section, {})[key] = value
+        user_data["_metadata"]["version"] += 1
+        return user_data
+    return mutate
+
+
+def update(store, phone_number, changes):
+    return store.update(phone_number, set_fields(changes), changes=changes)
+
+
+@pytest.fixture
+def json_store(tmp_path):
+    return JSONFileStore(str(tmp_path / "user_data.json"), str(tmp_path / "user_data.lock"))
+
+
+@pytest.fixture
+def sharded_store(tmp_path):
+    return ShardedFileStore(str(tmp_path / "shards"), shard_count=8)
+
+
+def phones_in_distinct_shards(store, count):
+    """Return count phone numbers that each map to a different shard."""
+    phones = {}
+    candidate = 9876500000
+    while len(phones) < count:
+        phones.setdefault(store.shard_for(str(candidate)), str(candidate))
+        candidate += 1
+    return list(phones.values())
+
+
+def reopen(store):
+    return JSONFileStore(store.data_file, store.lock_file)
+
+
+def test_journal_is_replayed_by_a_new_store(json_store):
+    update(json_store, "111", {"personal_info.full_name": "Asha"})
+    update(json_store, "111", {"personal_info.email": "asha@example.com"})
+    update(json_store, "222", {"personal_info.full_name": "Ravi"})
+
+    # Nothing has been checkpointed, so the snapshot alone is still empty
+    assert os.path.getsize(json_store.journal_file) > 0
+    assert reopen(json_store).load_all() == json_store.load_all()
+    assert reopen(json_store).get("111")["personal_info"] == {"full_name": "Asha", "email": "asha@example.com"}
+
+
+def test_checkpoint_folds_journal_into_snapshot(json_store):
+    update(json_store, "111", {"personal_info.full_name": "Asha"})
+    json_store.checkpoint()
+
+    assert os.path.getsize(json_store.journal_file) == 0
+    assert reopen(json_store).get("111")["personal_info"]["full_name"] == "Asha"
+
+
+def test_crash_between_checkpoint_and_truncate_replays_as_no_op(json_store):
+    update(json_store, "111", {"personal_info.full_name": "Asha"})
+    update(json_store, "111", {"personal_info.full_name": "Asha Menon"})
+    with open(json_store.journal_file, 'rb') as f:
+        journal = f.read()
+
+    # Simulate a crash after the snapshot rename but before the journal was emptied
+    json_store.checkpoint()
+    with open(json_store.journal_file, 'wb') as f:
+        f.write(journal)
+
+    recovered = reopen(json_store)
+    record = recovered.get("111")
+    assert record["personal_info"]["full_name"] == "Asha Menon"
+    assert record["_metadata"]["version"] == 2
+
+    # Later writes land after the stale entries and win on replay
+    update(recovered, "111", {"personal_info.full_name": "A. Menon"})
+    assert reopen(json_store).get("111")["personal_info"]["full_name"] == "A. Menon"
+
+
+def test_torn_journal_tail_is_dropped_and_truncated(json_store):
+    update(json_store, "111", {"personal_info.full_name": "Asha"})
+    intact_size = os.path.getsize(json_store.journal_file)
+
+    # A crash mid-append leaves a partial line without its newline
+    with open(json_store.journal_file, 'ab') as f:
+        f.write(b'{"phone":"111","version":2,"changes":{"personal_info.full')
+
+    recovered = reopen(json_store)
+    assert recovered.get("111")["personal_info"]["full_name"] == "Asha"
+    assert os.path.getsize(json_store.journal_file) == intact_size
+
+    # The next append starts on a clean line
+    update(recovered, "111", {"personal_info.email": "asha@example.com"})
+    assert reopen(json_store).get("111")["personal_info"] == {"full_name": "Asha", "email": "asha@example.com"}
+
+
+def test_corrupted_journal_line_is_an_error(json_store):
+    update(json_store, "111", {"personal_info.full_name": "Asha"})
+    with open(json_store.journal_file, 'ab') as f:
+        f.write(b'not json\n')
+
+    with pytest.raises(StoreCorruptedError):
+        reopen(json_store).get("111")
+
+
+def test_legacy_json_file_is_imported_into_shards(tmp_path):
+    legacy = JSONFileStore(str(tmp_path / "user_data.json"), str(tmp_path / "user_data.lock"))
+    update(legacy, "111", {"personal_info.full_name": "Asha"})
+    update(legacy, "222", {"personal_info.full_name": "Ravi"})
+
+    store = ShardedFileStore(str(tmp_path / "shards"), shard_count=8, import_json_file=legacy.data_file)
+    assert store.load_all() == legacy.load_all()
+    assert store.list_users() == {"111": store.shard_for("111"), "222": store.shard_for("222")}
+
+    # A second start does not import again over newer shard data
+    update(store, "111", {"personal_info.full_name": "Asha Menon"})
+    store = ShardedFileStore(str(tmp_path / "shards"), shard_count=8, import_json_file=legacy.data_file)
+    assert store.get("111")["personal_info"]["full_name"] == "Asha Menon"
+
+
+def test_backup_and_restore_shard(sharded_store, tmp_path):
+    phone = phones_in_distinct_shards(sharded_store, 1)[0]
+    shard = sharded_store.shard_for(phone)
+    update(sharded_store, phone, {"personal_info.full_name": "Asha"})
+    backup_file = sharded_store.backup_shard(shard, str(tmp_path / "backup"))
+
+    update(sharded_store, phone, {"personal_info.full_name": "Overwritten"})
+    assert sharded_store.restore_shard(shard, backup_file) == 1
+    assert sharded_store.get(phone)["personal_info"]["full_name"] == "Asha"
+
+
+def test_restore_into_wrong_shard_is_rejected(sharded_store, tmp_path):
+    phone, other_phone = phones_in_distinct_shards(sharded_store, 2)
+    update(sharded_store, phone, {"personal_info.full_name": "Asha"})
+    update(sharded_store, other_phone, {"personal_info.full_name": "Ravi"})
+    backup_file = sharded_store.backup_shard(sharded_store.shard_for(phone), str(tmp_path / "backup"))
+
+    wrong_shard = sharded_store.shard_for(other_phone)
+    with pytest.raises(ValueError):
+        sharded_store.restore_shard(wrong_shard, backup_file)
+
+    # The target shard and the index are untouched
+    assert sharded_store.get(other_phone)["personal_info"]["full_name"] == "Ravi"
+    assert sharded_store.list_users() == {
+        phone: sharded_store.shard_for(phone),
+        other_phone: wrong_shard
+    }
+
+
+def test_rebuild_index_from_shard_files(sharded_store):
+    phones = phones_in_distinct_shards(sharded_store, 3)
+    for phone in phones:
+        update(sharded_store, phone, {"personal_info.full_name": phone})
+    os.remove(sharded_store.index_file)
+
+    assert sharded_store.rebuild_index() == 3
+    assert sharded_store.list_users() == {phone: sharded_store.shard_for(phone) for phone in phones}
+
+
+def test_sqlite_stores_with_different_stripe_counts_lose_no_updates(tmp_path):
+    # Same database and lock directory, but users hash to different stripes in each store
+    db_file = str(tmp_path / "user_data.db")
+    stores = [SQLiteStore(db_file, lock_stripes=64), SQLiteStore(db_file, lock_stripes=7)]
+    assert stores[0]._stripes.stripe_for("111") != stores[1]._stripes.stripe_for("111")
+
+    def increment(user_data):
+        user_data = user_data or {"_metadata": {"version": 0}, "application_status": {"count": 0}}
+        user_data["application_status"]["count"] += 1
+        user_data["_metadata"]["version"] += 1
+        return user_data
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: stores[i % 2].update("111", increment), range(200)))
+
+    record = stores[0].get("111")
+    assert record["application_status"]["count"] == 200
+    assert record["_metadata"]["version"] == 200
@@ -8,6 +8,7 @@ for document processing, data extraction, and other specialized tasks.
 # Import user data management functions for easy access by agents
 from .user_data_manager import (
     update_user_data,
+    update_user_data_bulk,
     get_user_data, 
     get_required_data_schema
 )
@@ -20,6 +21,7 @@ from .rag_tool import (
 
 __all__ = [
     'update_user_data',
+    'update_user_data_bulk',
     'get_user_data',
     'get_required_data_schema',
     'search_course_documents', 
@@ -0,0 +1,184 @@
+"""
+In-Process Caches for KDM Document Search
+
+This module provides a small thread-safe LRU cache with TTL expiry and hit/miss
+counters, plus an embedding cache built on top of it that can optionally persist
+vectors to SQLite so repeat queries survive process restarts.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+
+class TTLCache:
+    """Thread-safe LRU cache with optional time-to-live expiry and usage counters."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _is_expired(self, expires_at: Optional[float]) -> bool:
+        return expires_at is not None and expires_at <= time.monotonic()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if self._is_expired(expires_at):
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the least recently used entry when full."""
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every cached entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+class EmbeddingCache(TTLCache):
+    """
+    Cache of text embeddings keyed on normalised text and model name.
+
+    Entries live in an in-process LRU; when persist_path is set they are also
+    written to a SQLite file and loaded back on a memory miss.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = None,
+        persist_path: Optional[str] = None
+    ):
+        super().__init__(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.model = model
+        self.persist_path = persist_path
+        self.disk_hits = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+        if persist_path:
+            try:
+                self._db = sqlite3.connect(persist_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Embedding cache persistence disabled: {e}")
+                self._db = None
+
+    @staticmethod
+    def normalise(text: str) -> str:
+        """Normalise text for cache lookups (collapse whitespace, lowercase)."""
+        # The BGE English tokenizer is uncased, so case does not change the vector
+        return re.sub(r"\s+", " ", text).strip().lower()
+
+    def make_key(self, text: str) -> str:
+        """Build the cache key for text under this cache's model."""
+        return hashlib.sha1(f"{self.model}\x00{self.normalise(text)}".encode("utf-8")).hexdigest()
+
+    def get_embedding(self, text: str) -> Optional[List[float]]:
+        """Return the cached embedding for text, checking memory then disk."""
+        key = self.make_key(text)
+        embedding = self.get(key)
+        if embedding is not None or self._db is None:
+            return embedding
+
+        embedding = self._load_from_disk(key)
+        if embedding is not None:
+            self.disk_hits += 1
+            super().set(key, embedding)
+        return embedding
+
+    def set_embedding(self, text: str, embedding: List[float]) -> None:
+        """Cache the embedding for text in memory and, if enabled, on disk."""
+        key = self.make_key(text)
+        self.set(key, embedding)
+        if self._db is not None:
+            self._save_to_disk(key, embedding)
+
+    def _load_from_disk(self, key: str) -> Optional[List[float]]:
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Embedding cache read error: {e}")
+            return None
+
+        if row is None:
+            return None
+
+        vector_bytes, created_at = row
+        if self.ttl_seconds and created_at + self.ttl_seconds <= time.time():
+            return None
+
+        vector = array("f")
+        vector.frombytes(vector_bytes)
+        return vector.tolist()
+
+    def _save_to_disk(self, key: str, embedding: List[float]) -> None:
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                    (key, array("f", embedding).tobytes(), time.time())
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Embedding cache write error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters including disk hits."""
+        stats = super().stats()
+        stats["disk_hits"] = self.disk_hits
+        stats["persistent"] = self._db is not None
+        return stats
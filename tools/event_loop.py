@@ -0,0 +1,135 @@
+"""
+Background Event Loop for KDM Tools
+
+This module owns a single long-lived asyncio event loop running in a daemon
+thread. Synchronous code (main.call_agent, sync tool wrappers, scripts) submits coroutines to it
+instead of creating a new thread and event loop per call, so loop-bound
+resources such as HTTP connection pools and the async Qdrant client are reused.
+"""
+
+import asyncio
+import queue
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional
+
+
+class BackgroundEventLoop:
+    """A persistent event loop running in its own daemon thread."""
+
+    def __init__(self, name: str = "kdm-background-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Return the running background loop, starting it on first use."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed() or not self._thread.is_alive():
+                self._start()
+            return self._loop
+
+    def _start(self) -> None:
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run_loop():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(started.set)
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=run_loop, name=self.name, daemon=True)
+        self._thread.start()
+        started.wait()
+        self._loop = loop
+
+    def run(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the background loop and block until it completes.
+
+        Args:
+            coro: Coroutine to execute
+            timeout: Optional maximum seconds to wait for the result
+
+        Raises:
+            RuntimeError: If called from the background loop thread itself (would deadlock)
+        """
+        loop = self.loop
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError(
+                "BackgroundEventLoop.run() cannot be called from its own loop thread; await the coroutine instead"
+            )
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    def iterate(self, async_iterator: AsyncIterator[Any]) -> Iterator[Any]:
+        """
+        Consume an async iterator on the background loop from synchronous code.
+
+        Items are handed over through a queue as soon as they are produced, so the
+        caller can act on each one (e.g. stream it to a UI) before the next is ready.
+        Closing the returned generator early cancels the async iterator.
+
+        Raises:
+            RuntimeError: If called from the background loop thread itself (would deadlock)
+        """
+        loop = self.loop
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("BackgroundEventLoop.iterate() cannot be called from its own loop thread")
+
+        items: "queue.Queue[tuple]" = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in async_iterator:
+                    items.put(("item", item))
+            except BaseException as e:
+                items.put(("error", e))
+                raise
+            finally:
+                items.put(("done", None))
+
+        future = asyncio.run_coroutine_threadsafe(pump(), loop)
+        try:
+            while True:
+                kind, value = items.get()
+                if kind == "item":
+                    yield value
+                elif kind == "error":
+                    if not isinstance(value, asyncio.CancelledError):
+                        raise value
+                else:
+                    return
+        finally:
+            if not future.done():
+                future.cancel()
+
+    def stop(self) -> None:
+        """Stop the background loop and wait for its thread to exit."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+
+
+# Shared background loop for all synchronous tool wrappers
+_background_loop = BackgroundEventLoop()
+
+
+def get_background_loop() -> BackgroundEventLoop:
+    """Return the shared background event loop."""
+    return _background_loop
+
+
+def run_sync(coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+    """Run a coroutine to completion on the shared background loop from synchronous code."""
+    return _background_loop.run(coro, timeout)
+
+
+def iterate_sync(async_iterator: AsyncIterator[Any]) -> Iterator[Any]:
+    """Iterate an async iterator on the shared background loop from synchronous code."""
+    return _background_loop.iterate(async_iterator)
@@ -0,0 +1,213 @@
+"""
+Local In-Process Vector Index for KDM Document Search
+
+This module provides an exact cosine-similarity index held in a contiguous
+NumPy float32 matrix. It is used as an alternative to the remote Qdrant
+collection for small knowledge bases, where a vectorised dot product over
+every row is faster than a network round trip.
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+VECTORS_FILE = "vectors.npy"
+PAYLOADS_FILE = "payloads.json"
+
+
+class LocalVectorIndex:
+    """Exact cosine-similarity index over L2-normalised float32 vectors."""
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self._vectors = np.empty((0, dimensions), dtype=np.float32)
+        self._ids: List[Union[int, str]] = []
+        self._payloads: List[Dict[str, Any]] = []
+        self._rows: Dict[Union[int, str], int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _normalise(self, vectors: Any) -> np.ndarray:
+        """Return vectors as a contiguous float32 matrix with unit-length rows."""
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dimensions)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def upsert(
+        self,
+        ids: List[Union[int, str]],
+        vectors: List[List[float]],
+        payloads: List[Dict[str, Any]]
+    ) -> None:
+        """Insert or replace vectors by ID."""
+        if not ids:
+            return
+
+        normalised = self._normalise(vectors)
+
+        with self._lock:
+            # Copy so that a memory-mapped (read-only) matrix is never written in place,
+            # and readers holding the old matrix keep a consistent view
+            matrix = np.array(self._vectors, dtype=np.float32)
+            row_ids = list(self._ids)
+            row_payloads = list(self._payloads)
+            rows = dict(self._rows)
+
+            new_vectors = []
+            for point_id, vector, payload in zip(ids, normalised, payloads):
+                row = rows.get(point_id)
+                if row is None:
+                    rows[point_id] = len(row_ids)
+                    row_ids.append(point_id)
+                    row_payloads.append(payload)
+                    new_vectors.append(vector)
+                else:
+                    matrix[row] = vector
+                    row_payloads[row] = payload
+
+            if new_vectors:
+                matrix = np.concatenate([matrix, np.vstack(new_vectors)])
+
+            self._vectors = np.ascontiguousarray(matrix)
+            self._ids = row_ids
+            self._payloads = row_payloads
+            self._rows = rows
+
+    @staticmethod
+    def _matches(payload: Dict[str, Any], payload_filter: Dict[str, Any]) -> bool:
+        """Return whether payload satisfies every field condition in payload_filter."""
+        for key, expected in payload_filter.items():
+            value = payload.get(key)
+            if isinstance(expected, (list, tuple, set)):
+                if value not in expected:
+                    return False
+            elif value != expected:
+                return False
+        return True
+
+    def search(
+        self,
+        query_vector: List[float],
+        limit: int = 5,
+        score_threshold: Optional[float] = None,
+        payload_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Union[int, str], float, Dict[str, Any]]]:
+        """
+        Return the most similar vectors to query_vector.
+
+        Args:
+            query_vector: Query embedding
+            limit: Maximum number of results
+            score_threshold: Minimum cosine score to include
+            payload_filter: Optional {field: value} conditions (a list value matches any of its items)
+
+        Returns:
+            List of (id, cosine score, payload) tuples, best match first
+        """
+        with self._lock:
+            vectors, ids, payloads = self._vectors, self._ids, self._payloads
+
+        if not ids or limit <= 0:
+            return []
+
+        if payload_filter:
+            rows = np.fromiter(
+                (row for row, payload in enumerate(payloads) if self._matches(payload, payload_filter)),
+                dtype=np.intp
+            )
+        else:
+            rows = np.arange(len(ids))
+
+        if not len(rows):
+            return []
+
+        query = self._normalise(query_vector)[0]
+        scores = vectors[rows] @ query if payload_filter else vectors @ query
+
+        if limit < len(scores):
+            candidates = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            candidates = np.arange(len(scores))
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        results = []
+        for candidate in candidates:
+            score = float(scores[candidate])
+            if score_threshold is not None and score < score_threshold:
+                break
+            row = rows[candidate]
+            results.append((ids[row], score, payloads[row]))
+        return results
+
+    def save(self, path: Union[str, Path], dtype: Union[str, np.dtype] = np.float32) -> None:
+        """
+        Persist the index as a .npy matrix plus a JSON payload file.
+
+        Args:
+            path: Directory to write the index files into
+            dtype: Storage dtype for vectors; float16 halves the file size at a
+                negligible cost in cosine precision
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        with self._lock:
+            vectors, ids, payloads = self._vectors, self._ids, self._payloads
+
+        # Write to temporary names first so a concurrent mmap never sees a half-written file
+        vectors_tmp = path / f"{VECTORS_FILE}.tmp"
+        payloads_tmp = path / f"{PAYLOADS_FILE}.tmp"
+        with open(vectors_tmp, 'wb') as f:
+            np.save(f, np.ascontiguousarray(vectors, dtype=dtype))
+        with open(payloads_tmp, 'w', encoding='utf-8') as f:
+            json.dump({"ids": ids, "payloads": payloads}, f, separators=(",", ":"))
+        vectors_tmp.replace(path / VECTORS_FILE)
+        payloads_tmp.replace(path / PAYLOADS_FILE)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], dimensions: int, mmap: bool = True) -> "LocalVectorIndex":
+        """
+        Load an index saved with save().
+
+        A float32 matrix is memory-mapped and searched in place. Other storage
+        dtypes (e.g. a float16 snapshot) are converted to float32 once here, so
+        searches never upcast the whole matrix per query; float16 then saves
+        disk space and load I/O but not resident memory.
+
+        Args:
+            path: Directory containing the index files
+            dimensions: Expected vector dimensions
+            mmap: Memory-map the vector matrix instead of reading it into memory
+        """
+        path = Path(path)
+        index = cls(dimensions)
+
+        vectors = np.load(path / VECTORS_FILE, mmap_mode='r' if mmap else None)
+        if vectors.ndim != 2 or vectors.shape[1] != dimensions:
+            raise ValueError(f"Index at {path} has shape {vectors.shape}, expected (n, {dimensions})")
+        if vectors.dtype != np.float32:
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+        with open(path / PAYLOADS_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if len(data["ids"]) != vectors.shape[0]:
+            raise ValueError(f"Index at {path} has {vectors.shape[0]} vectors but {len(data['ids'])} payloads")
+
+        index._vectors = vectors
+        index._ids = data["ids"]
+        index._payloads = data["payloads"]
+        index._rows = {point_id: row for row, point_id in enumerate(index._ids)}
+        return index
+
+    @staticmethod
+    def exists(path: Union[str, Path]) -> bool:
+        """Return whether a saved index is present at path."""
+        path = Path(path)
+        return (path / VECTORS_FILE).exists() and (path / PAYLOADS_FILE).exists()
@@ -0,0 +1,314 @@
+"""
+Locking Primitives for KDM User Data Storage
+
+This module provides the locks used by the user data stores:
+
+- InterProcessLock: an exclusive lock that serialises threads in this process
+  with a threading.Lock and other processes with an OS file lock (flock on
+  Unix, msvcrt on Windows) held on a persistent lock file. A contended flock
+  is waited for with a blocking call, so waiters wake as soon as it is released
+- StripedLock: a fixed set of InterProcessLocks selected by hashing a key,
+  so writers for different users rarely share a lock
+- LockStats: wait-time metrics shared by every lock in this module
+
+The lock file is opened once per process and never deleted, so every process
+always locks the same inode.
+"""
+
+import os
+import platform
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+# Platform-specific imports for file locking
+if platform.system() == "Windows":
+    import msvcrt
+else:
+    import fcntl
+
+# Backoff between non-blocking attempts on a contended file lock (Windows only,
+# where msvcrt has no blocking lock call that honours a timeout)
+_MIN_BACKOFF_SECONDS = 0.001
+_MAX_BACKOFF_SECONDS = 0.05
+
+
+class LockTimeoutError(TimeoutError):
+    """Raised when a lock could not be acquired within its timeout."""
+
+
+class LockStats:
+    """Thread-safe counters describing how long callers waited for a lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.acquisitions = 0
+            self.contended = 0
+            self.timeouts = 0
+            self.total_wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+
+    def record(self, wait_seconds: float, acquired: bool, contended: bool) -> None:
+        """Record one acquisition attempt."""
+        with self._lock:
+            if acquired:
+                self.acquisitions += 1
+            else:
+                self.timeouts += 1
+            if contended:
+                self.contended += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.acquisitions + self.timeouts
+            return {
+                "acquisitions": self.acquisitions,
+                "contended": self.contended,
+                "timeouts": self.timeouts,
+                "total_wait_ms": round(self.total_wait_seconds * 1000, 3),
+                "avg_wait_ms": round(self.total_wait_seconds * 1000 / attempts, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3)
+            }
+
+
+class _FlockWaiter:
+    """
+    A helper thread blocked in flock on its own descriptor for the lock file.
+
+    flock locks belong to the open file description, so a late acquisition can
+    be dropped simply by closing the descriptor. Once the flock returns, the
+    descriptor is handed to the caller waiting at that moment, or closed if
+    there is none; either way the waiter is then finished.
+    """
+
+    def __init__(self, path: str):
+        self.pid = os.getpid()
+        self.finished = False
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._locked = False
+        self._error: Optional[OSError] = None
+        self._waiting = 0
+        self._started = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=f"flock-wait:{os.path.basename(path)}", daemon=True)
+
+    def _run(self) -> None:
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except OSError as e:
+            self._error = e
+        with self._condition:
+            if self._error is not None or not self._waiting:
+                # Failed, or every caller gave up: closing the descriptor releases the lock
+                os.close(self._fd)
+                self.finished = True
+            else:
+                self._locked = True
+            self._condition.notify_all()
+
+    def wait(self, timeout: float) -> Optional[int]:
+        """Return the locked descriptor (ending the waiter), or None if it finished or timeout expired first."""
+        with self._condition:
+            self._waiting += 1
+            if not self._started:
+                self._started = True
+                # Started only once a caller is counted, so a prompt flock is handed over rather than dropped
+                self._thread.start()
+            try:
+                self._condition.wait_for(lambda: self._locked or self.finished, max(0.0, timeout))
+                if self._locked:
+                    self._locked = False
+                    self.finished = True
+                    return self._fd
+                if self._error is not None:
+                    raise self._error
+                return None
+            finally:
+                self._waiting -= 1
+
+
+class InterProcessLock:
+    """
+    Exclusive lock across threads and processes backed by a lock file.
+
+    Threads in the same process queue on a threading.Lock (which blocks without
+    polling), so only one thread at a time competes for the OS file lock. An
+    uncontended file lock is taken with one non-blocking flock on the process's
+    persistent descriptor. When another process holds it, a _FlockWaiter
+    thread blocks in flock on a fresh descriptor and the caller waits on it
+    with the timeout. A waiter outlives a caller that gives up and is reused by
+    the next one; if nobody is waiting when its flock returns, it closes its
+    descriptor, dropping the lock. On Windows the file lock is retried with
+    exponential backoff instead.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0, stats: Optional[LockStats] = None):
+        self.path = path
+        self.timeout = timeout
+        self.stats = stats or LockStats()
+        self._thread_lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        self._held_fd: Optional[int] = None
+        self._waiter: Optional["_FlockWaiter"] = None  # Only touched while _thread_lock is held
+
+    def _file_descriptor(self) -> int:
+        """Return this process's descriptor for the lock file, reopening it after a fork."""
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _try_lock_file(self, fd: int) -> bool:
+        try:
+            if platform.system() == "Windows":
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except (IOError, OSError):
+            return False
+
+    def _unlock_file(self, fd: int) -> None:
+        try:
+            if platform.system() == "Windows":
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        except (IOError, OSError):
+            pass  # Best effort release
+
+    def _poll_for_file_lock(self, fd: int, deadline: float) -> bool:
+        """Retry a non-blocking lock with exponential backoff until deadline (Windows)."""
+        backoff = _MIN_BACKOFF_SECONDS
+        while not self._try_lock_file(fd):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(backoff, remaining))
+            backoff = min(backoff * 2, _MAX_BACKOFF_SECONDS)
+        return True
+
+    def _wait_for_file_lock(self, timeout: float) -> Optional[int]:
+        """
+        Wait at most timeout seconds for this lock's flock waiter (Unix).
+
+        A waiter left behind by a caller that timed out is reused, so each lock
+        has at most one helper thread and descriptor outstanding however often
+        acquisitions time out.
+
+        Returns:
+            The descriptor now holding the lock, or None if the timeout expired
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            waiter = self._waiter
+            if waiter is None or waiter.finished or waiter.pid != os.getpid():
+                waiter = self._waiter = _FlockWaiter(self.path)
+            fd = waiter.wait(deadline - time.monotonic())
+            if fd is not None or time.monotonic() >= deadline:
+                return fd
+
+    def acquire(self, timeout: Optional[float] = None) -> None:
+        """
+        Acquire the lock, blocking for at most timeout seconds.
+
+        Args:
+            timeout: Maximum seconds to wait (defaults to the lock's timeout)
+
+        Raises:
+            LockTimeoutError: If the lock is still held elsewhere when the timeout expires
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        contended = not self._thread_lock.acquire(blocking=False)
+        if contended and not self._thread_lock.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            self.stats.record(time.monotonic() - start, acquired=False, contended=True)
+            raise LockTimeoutError(f"Could not acquire lock {self.path} within {timeout}s")
+
+        try:
+            fd = self._file_descriptor()
+            if not self._try_lock_file(fd):
+                contended = True
+                remaining = deadline - time.monotonic()
+                if platform.system() == "Windows":
+                    if not self._poll_for_file_lock(fd, deadline):
+                        fd = None
+                else:
+                    fd = self._wait_for_file_lock(remaining)
+                if fd is None:
+                    self.stats.record(time.monotonic() - start, acquired=False, contended=True)
+                    raise LockTimeoutError(f"Could not acquire lock {self.path} within {timeout}s")
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+        self._held_fd = fd
+        self.stats.record(time.monotonic() - start, acquired=True, contended=contended)
+
+    def release(self) -> None:
+        """Release the lock (the lock file itself is kept)."""
+        fd, self._held_fd = self._held_fd, None
+        self._unlock_file(fd)
+        if fd != self._fd:
+            os.close(fd)  # Descriptor opened by _wait_for_file_lock
+        self._thread_lock.release()
+
+    def __enter__(self) -> "InterProcessLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+
+class StripedLock:
+    """
+    A fixed pool of inter-process locks indexed by key.
+
+    Each key (e.g. a phone number) maps to one stripe via a hash that is stable
+    across processes, so two writers only contend when their keys share a
+    stripe. Stripe lock files live in one directory and are created on first use.
+    """
+
+    def __init__(self, directory: str, stripes: int = 64, timeout: float = 30.0):
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+        self.directory = directory
+        self.stripes = stripes
+        self.timeout = timeout
+        self.stats = LockStats()
+        self._locks: Dict[int, InterProcessLock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def stripe_for(self, key: str) -> int:
+        """Return the stripe index for key (crc32, unlike hash(), is the same in every process)."""
+        return zlib.crc32(key.encode("utf-8")) % self.stripes
+
+    def for_key(self, key: str) -> InterProcessLock:
+        """Return the lock guarding key."""
+        return self.for_stripe(self.stripe_for(key))
+
+    def for_stripe(self, stripe: int) -> InterProcessLock:
+        """Return the lock for stripe number stripe."""
+        lock = self._locks.get(stripe)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._locks.get(stripe)
+                if lock is None:
+                    path = os.path.join(self.directory, f"stripe-{stripe:03d}.lock")
+                    lock = InterProcessLock(path, timeout=self.timeout, stats=self.stats)
+                    self._locks[stripe] = lock
+        return lock
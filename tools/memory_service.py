@@ -0,0 +1,271 @@
+"""
+Conversation Memory Service for KDM Student Onboarding System
+
+This module provides an in-memory ADK memory service that ingests sessions
+incrementally. ADK's InMemoryMemoryService re-reads the whole session every
+time add_session_to_memory is called, and main.py calls it on every turn, so
+ingestion cost grows with the square of the conversation length. This service
+keeps a per-session watermark (the number of session events already ingested)
+and only appends events added since the previous call.
+
+Stored turns are indexed per user by a pluggable text index:
+- BM25MemoryIndex (default): an inverted index ranked with BM25, so a search
+  only touches turns containing a query term
+- KeywordMemoryIndex: the original scan of every turn for any shared word
+
+With MEMORY_CONFIG["vector_search"], each turn is also embedded into a
+per-user LocalVectorIndex and cosine results are fused with the text results.
+"""
+
+import math
+import re
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from google.adk.events import Event
+from google.adk.memory.base_memory_service import BaseMemoryService, SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.sessions import Session
+
+# Add parent directory to path to import config
+sys.path.append(str(Path(__file__).parent.parent))
+from config import MEMORY_CONFIG
+
+# Rank constant for reciprocal rank fusion of text and vector results
+_RRF_K = 60
+
+
+def _extract_words_lower(text: str) -> Set[str]:
+    """Extract lowercase words from text (same tokenisation as ADK's InMemoryMemoryService)."""
+    return set(word.lower() for word in re.findall(r'[A-Za-z]+', text))
+
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric terms, keeping digits so phone numbers and years are searchable."""
+    return re.findall(r'[a-z0-9]+', text.lower())
+
+
+def _event_text(event: Event) -> str:
+    return " ".join(part.text for part in event.content.parts if part.text)
+
+
+class KeywordMemoryIndex:
+    """Linear scan returning every turn that shares a word with the query, oldest first."""
+
+    name = "keyword"
+
+    def __init__(self):
+        self._documents: List[Set[str]] = []
+
+    def add(self, doc_id: int, text: str) -> None:
+        self._documents.append(_extract_words_lower(text))
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        words_in_query = _extract_words_lower(query)
+        return [
+            (doc_id, 1.0) for doc_id, words in enumerate(self._documents)
+            if not words_in_query.isdisjoint(words)
+        ]
+
+
+class BM25MemoryIndex:
+    """Inverted index over one user's turns, ranked with Okapi BM25."""
+
+    name = "bm25"
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}  # term -> {doc id: term frequency}
+        self._lengths: Dict[int, int] = {}
+        self._total_length = 0
+
+    def add(self, doc_id: int, text: str) -> None:
+        terms = _tokenize(text)
+        for term, frequency in Counter(terms).items():
+            self._postings.setdefault(term, {})[doc_id] = frequency
+        self._lengths[doc_id] = len(terms)
+        self._total_length += len(terms)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        document_count = len(self._lengths)
+        if not document_count:
+            return []
+
+        average_length = self._total_length / document_count or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(_tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                length_norm = 1 - self.b + self.b * self._lengths[doc_id] / average_length
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (
+                    frequency + self.k1 * length_norm
+                )
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit] if limit else ranked
+
+
+_INDEX_TYPES = {index_type.name: index_type for index_type in (BM25MemoryIndex, KeywordMemoryIndex)}
+
+
+class _UserMemory:
+    """One user's stored turns with their text index and optional vector index."""
+
+    def __init__(self, text_index):
+        self.events: List[Event] = []
+        self.text_index = text_index
+        self.vector_index = None
+
+
+class IncrementalMemoryService(BaseMemoryService):
+    """In-memory conversation memory that only ingests events added since the last call per session."""
+
+    def __init__(
+        self,
+        backend: str = MEMORY_CONFIG["backend"],
+        max_results: int = MEMORY_CONFIG["max_results"],
+        vector_search: bool = MEMORY_CONFIG["vector_search"]
+    ):
+        if backend not in _INDEX_TYPES:
+            raise ValueError(f"Unknown memory backend: {backend}")
+        self.backend = backend
+        self.max_results = max_results
+        self.vector_search = vector_search
+
+        # "app_name/user_id" -> that user's turns and indexes
+        self._users: Dict[str, _UserMemory] = {}
+        # ("app_name/user_id", session id) -> number of session events already ingested
+        self._watermarks: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self.events_ingested = 0
+
+    @staticmethod
+    def _user_key(app_name: str, user_id: str) -> str:
+        return f"{app_name}/{user_id}"
+
+    def _new_text_index(self):
+        if self.backend == BM25MemoryIndex.name:
+            return BM25MemoryIndex(MEMORY_CONFIG["bm25_k1"], MEMORY_CONFIG["bm25_b"])
+        return _INDEX_TYPES[self.backend]()
+
+    async def add_session_to_memory(self, session: Session):
+        """Index the session's events added since the previous call for this session."""
+        user_key = self._user_key(session.app_name, session.user_id)
+        events = session.events
+        watermark_key = (user_key, session.id)
+
+        with self._lock:
+            memory = self._users.get(user_key)
+            if memory is None:
+                memory = self._users[user_key] = _UserMemory(self._new_text_index())
+
+            # A recreated session starts a new watermark; its earlier turns stay in the index
+            watermark = self._watermarks.get(watermark_key, 0)
+            if watermark > len(events):
+                watermark = 0
+
+            new_turns = []
+            for event in events[watermark:]:
+                if not event.content or not event.content.parts:
+                    continue
+                text = _event_text(event)
+                if not text.strip():
+                    continue
+                doc_id = len(memory.events)
+                memory.events.append(event)
+                memory.text_index.add(doc_id, text)
+                new_turns.append((doc_id, text))
+
+            self._watermarks[watermark_key] = len(events)
+            self.events_ingested += len(new_turns)
+
+        if self.vector_search and new_turns:
+            await self._add_vectors(memory, new_turns)
+
+    async def _add_vectors(self, memory: _UserMemory, turns: List[Tuple[int, str]]) -> None:
+        """Embed new turns into the user's vector index (failures only disable vector recall for them)."""
+        from .local_index import LocalVectorIndex
+        from .vector import EMBEDDING_CONFIG, generate_embeddings
+
+        try:
+            embeddings = await generate_embeddings([text for _, text in turns])
+        except Exception as e:
+            print(f"Memory embedding error: {e}")
+            return
+
+        ids = [doc_id for (doc_id, _), embedding in zip(turns, embeddings) if embedding]
+        vectors = [embedding for embedding in embeddings if embedding]
+        if not ids:
+            return
+
+        with self._lock:
+            if memory.vector_index is None:
+                memory.vector_index = LocalVectorIndex(EMBEDDING_CONFIG["dimensions"])
+            memory.vector_index.upsert(ids, vectors, [{} for _ in ids])
+
+    async def _vector_search(self, memory: _UserMemory, query: str) -> List[Tuple[int, float]]:
+        from .vector import generate_embedding
+
+        if memory.vector_index is None:
+            return []
+        try:
+            query_vector = await generate_embedding(query)
+        except Exception as e:
+            print(f"Memory embedding error: {e}")
+            return []
+        if not query_vector:
+            return []
+        return [(doc_id, score) for doc_id, score, _ in memory.vector_index.search(query_vector, self.max_results)]
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        """Return this user's turns most relevant to the query."""
+        user_key = self._user_key(app_name, user_id)
+        with self._lock:
+            memory = self._users.get(user_key)
+            if memory is None:
+                return SearchMemoryResponse()
+            events = memory.events
+            limit = None if self.backend == KeywordMemoryIndex.name else self.max_results
+            ranked = memory.text_index.search(query, limit)
+
+        if self.vector_search:
+            vector_ranked = await self._vector_search(memory, query)
+            if vector_ranked:
+                # Reciprocal rank fusion of the text and vector rankings
+                fused: Dict[int, float] = {}
+                for results in (ranked, vector_ranked):
+                    for rank, (doc_id, _) in enumerate(results):
+                        fused[doc_id] = fused.get(doc_id, 0.0) + 1 / (_RRF_K + rank + 1)
+                ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:self.max_results]
+
+        response = SearchMemoryResponse()
+        for doc_id, _ in ranked:
+            event = events[doc_id]
+            response.memories.append(
+                MemoryEntry(
+                    content=event.content,
+                    author=event.author,
+                    timestamp=datetime.fromtimestamp(event.timestamp).isoformat()
+                )
+            )
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return how many users, sessions and turns are held in memory."""
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "vector_search": self.vector_search,
+                "users": len(self._users),
+                "sessions": len(self._watermarks),
+                "events_stored": sum(len(memory.events) for memory in self._users.values()),
+                "events_ingested": self.events_ingested
+            }
@@ -5,9 +5,13 @@ This tool allows agents to search conversation history and previous interactions
 to maintain context across agent transfers and sessions.
 """
 
-import asyncio
+import sys
+from pathlib import Path
 from typing import Dict, Any, Optional
-import json
+from google.adk.tools import ToolContext
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config import DEFAULT_USER_ID
 
 # Global reference to the runner for memory access
 _runner = None
@@ -17,13 +21,25 @@ def set_runner(runner):
     global _runner
     _runner = runner
 
-async def search_conversation_memory_async(query: str, user_id: str = "user123", app_name: str = "KDM_Student_Onboarding") -> Dict[str, Any]:
+def _resolve_user_id(tool_context: Optional[ToolContext]) -> str:
+    """Return the user ID of the session the tool was called from (DEFAULT_USER_ID outside a session)."""
+    if tool_context is not None:
+        user_id = getattr(tool_context, "user_id", None)
+        if user_id:
+            return user_id
+        invocation_context = getattr(tool_context, "_invocation_context", None)
+        session = getattr(invocation_context, "session", None)
+        if session is not None and session.user_id:
+            return session.user_id
+    return DEFAULT_USER_ID
+
+async def search_conversation_memory_async(query: str, user_id: str = DEFAULT_USER_ID, app_name: str = "KDM_Student_Onboarding") -> Dict[str, Any]:
     """
     Search conversation memory for relevant context.
     
     Args:
         query: Search query to find relevant conversation history
-        user_id: User ID to search within
+        user_id: User ID whose conversations are searched
         app_name: Application name
         
     Returns:
@@ -69,48 +85,41 @@ async def search_conversation_memory_async(query: str, user_id: str = "user123",
             "memories": []
         }
 
-def search_conversation_memory(query: str, user_id: str = "user123", app_name: str = "KDM_Student_Onboarding") -> str:
+async def search_conversation_memory(query: str, app_name: str = "KDM_Student_Onboarding", tool_context: ToolContext = None) -> Dict[str, Any]:
     """
-    Search conversation memory for relevant context (synchronous wrapper).
+    Search the current user's conversation memory for relevant context.
     
     This tool helps agents find relevant information from previous conversations,
     including phone numbers, extracted document data, and user preferences.
+    Only the current user's conversations are searched.
     
     Args:
         query: Search query (e.g., "phone number", "academic qualification", "12th grade")
-        user_id: User ID to search within (default: "user123")
         app_name: Application name (default: "KDM_Student_Onboarding")
+        tool_context: ADK tool context (automatically provided; identifies the current user)
         
     Returns:
-        JSON string with search results including relevant conversation history
+        Dict with search results including relevant conversation history
         
     Examples:
         - search_conversation_memory("phone number") - Find user's phone number
         - search_conversation_memory("academic qualification") - Find education details
         - search_conversation_memory("document upload") - Find uploaded document info
     """
-    # Run the async function in an event loop
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    
-    result = loop.run_until_complete(
-        search_conversation_memory_async(query, user_id, app_name)
-    )
-    
-    return json.dumps(result, indent=2)
+    # Awaited directly on the runner's loop: blocking on run_sync here would fail,
+    # because agent turns run on that same background loop
+    return await search_conversation_memory_async(query, _resolve_user_id(tool_context), app_name)
 
-def get_conversation_context(context_type: str = "recent") -> str:
+async def get_conversation_context(context_type: str = "recent", tool_context: ToolContext = None) -> Dict[str, Any]:
     """
     Get conversation context for better agent coordination.
     
     Args:
         context_type: Type of context to retrieve ("recent", "user_profile", "documents")
+        tool_context: ADK tool context (automatically provided; identifies the current user)
         
     Returns:
-        JSON string with relevant context information
+        Dict with relevant context information
     """
     if context_type == "recent":
         query = "recent conversation user message"
@@ -121,4 +130,4 @@ def get_conversation_context(context_type: str = "recent") -> str:
     else:
         query = context_type
     
-    return search_conversation_memory(query) 
\ No newline at end of file
+    return await search_conversation_memory(query, tool_context=tool_context) 
\ No newline at end of file
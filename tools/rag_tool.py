@@ -5,18 +5,124 @@ This module provides RAG (Retrieval-Augmented Generation) functionality as a too
 for Google ADK agents to search and retrieve relevant course documents.
 """
 
-import asyncio
-from typing import Dict, List, Any
+import sys
+from pathlib import Path
+from typing import Dict, List, Any, Tuple
 from google.adk.tools import ToolContext
 
 # Import vector database functions
-from .vector import search_similar_chunks, initialize_collection
+from .vector import search_similar_chunks, ensure_collection, get_collection_version
+from .cache import TTLCache, EmbeddingCache
+from .event_loop import run_sync
+from .serialization import dumps
 
+sys.path.append(str(Path(__file__).parent.parent))
+from config import SEARCH_CACHE_CONFIG
 
-async def search_course_documents_async(
+# Cache of raw search hits keyed on (query, limit, score_threshold, collection version)
+_search_cache = TTLCache(
+    max_entries=SEARCH_CACHE_CONFIG["max_entries"],
+    ttl_seconds=SEARCH_CACHE_CONFIG["ttl_seconds"]
+) if SEARCH_CACHE_CONFIG["enabled"] else None
+_search_cache_version = None
+
+
+def _get_cached_results(cache_key: tuple) -> Any:
+    """Look up search hits, dropping the whole cache once the collection version moves on."""
+    global _search_cache_version
+    version = cache_key[-1]
+    if version != _search_cache_version:
+        _search_cache.clear()
+        _search_cache_version = version
+    return _search_cache.get(cache_key)
+
+
+def get_search_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters for the search result cache."""
+    if _search_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **_search_cache.stats()}
+
+
+# course_name payload values in the knowledge base (the course_name: lines of knowledge_base_courses.txt)
+COURSE_NAMES = (
+    "Course Catalog Overview",
+    "Bachelor Computer Science Software Engineering",
+    "Bachelor Computer Science Artificial Intelligence",
+    "Bachelor Business Administration Marketing",
+    "Master Business Administration MBA",
+    "Bachelor Mechanical Engineering",
+    "Bachelor Nursing",
+    "Admission Requirements",
+    "Application Process & Deadlines",
+    "Campus Facilities & Student Life",
+    "Scholarships & Financial Aid",
+    "Career Services & Industry Partnerships"
+)
+_COURSE_NAMES_BY_KEY = {name.lower(): name for name in COURSE_NAMES}
+
+# General documents that apply to every programme's eligibility
+_ADMISSION_COURSE_NAMES = ("Admission Requirements", "Application Process & Deadlines")
+
+
+def _resolve_course_names(course_name: str, program_filter: str = "") -> Tuple[List[str], List[str]]:
+    """
+    Split the course name arguments into exact course names and free-text hints.
+    
+    course_name is comma-separated; names are matched case-insensitively against
+    COURSE_NAMES. program_filter is used as a course name only when it is one and
+    no course_name was given. Anything unrecognised is returned as a hint to be
+    added to the query text, so a guessed name still searches rather than
+    matching nothing.
+    
+    Returns:
+        (course names to filter on, hints to append to the query)
+    """
+    course_names, hints = [], []
+    for name in (course_name or "").split(","):
+        if name.strip():
+            canonical = _COURSE_NAMES_BY_KEY.get(name.strip().lower())
+            (course_names if canonical else hints).append(canonical or name.strip())
+    
+    if program_filter and program_filter.strip():
+        canonical = _COURSE_NAMES_BY_KEY.get(program_filter.strip().lower())
+        if canonical and not course_names:
+            course_names.append(canonical)
+        elif canonical not in course_names:
+            hints.append(program_filter.strip())
+    return course_names, hints
+
+
+def _build_filters(level: str = "", content_type: str = "", course_names: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """
+    Build payload filters from the non-empty structured filter arguments.
+    
+    level and content_type accept comma-separated values (e.g. "pg,general"),
+    which match documents having any of the listed values; course_names are
+    exact names already resolved by _resolve_course_names.
+    """
+    filters = {}
+    for key, raw_value in (("level", level), ("type", content_type)):
+        values = [value.strip().lower() for value in (raw_value or "").split(",") if value.strip()]
+        if len(values) == 1:
+            filters[key] = values[0]
+        elif values:
+            filters[key] = tuple(values)
+    if len(course_names) == 1:
+        filters["course_name"] = course_names[0]
+    elif course_names:
+        filters["course_name"] = tuple(course_names)
+    return filters
+
+
+# Agent tools: ADK awaits these on the runner's event loop and declares each under its function name
+async def search_course_documents(
     query: str, 
     program_filter: str = "", 
     limit: int = 5,
+    level: str = "",
+    content_type: str = "",
+    course_name: str = "",
     tool_context: ToolContext = None
 ) -> Dict[str, Any]:
     """
@@ -28,8 +134,22 @@ async def search_course_documents_async(
     
     Args:
         query: The search query describing what information is needed
-        program_filter: Optional filter to search within specific program/course (default: "")
+        program_filter: Optional programme name; used as the course_name filter when it is
+            one of the course names below, otherwise added to the query as a search hint (default: "")
         limit: Maximum number of relevant documents to return (default: 5)
+        level: Only return documents of this level: "ug", "pg" or "general";
+            comma-separate to allow several, e.g. "pg,general" (default: any)
+        content_type: Only return documents of this type: "overview", "financial",
+            "requirements", "career" or "facilities"; comma-separate to allow several (default: any)
+        course_name: Only return documents for these courses; comma-separate to allow several
+            (default: any). One of: "Course Catalog Overview",
+            "Bachelor Computer Science Software Engineering",
+            "Bachelor Computer Science Artificial Intelligence",
+            "Bachelor Business Administration Marketing", "Master Business Administration MBA",
+            "Bachelor Mechanical Engineering", "Bachelor Nursing", "Admission Requirements",
+            "Application Process & Deadlines", "Campus Facilities & Student Life",
+            "Scholarships & Financial Aid", "Career Services & Industry Partnerships".
+            Other names are added to the query as a search hint instead
         tool_context: ADK tool context (automatically provided, can be None)
         
     Returns:
@@ -39,18 +159,43 @@ async def search_course_documents_async(
         {"status": "success", "documents": [...], "total_found": 3}
     """
     try:
-        # Ensure collection is initialized
-        await initialize_collection()
+        # Ensure collection is initialized (only contacts Qdrant on the first call)
+        await ensure_collection()
         
-        # Enhance query with program filter if provided
-        enhanced_query = f"{query} {program_filter}".strip() if program_filter and program_filter.strip() else query
+        # Known course names become payload filters; anything else falls back to a query hint
+        course_names, hints = _resolve_course_names(course_name, program_filter)
+        enhanced_query = " ".join([query, *hints]).strip() if hints else query
         
-        # Search for similar document chunks
-        results = await search_similar_chunks(
-            query_text=enhanced_query,
-            limit=limit,
-            score_threshold=0.6  # Lower threshold for more results
-        )
+        # Structured payload filters are applied by the vector store, not via the query text
+        filters = _build_filters(level, content_type, tuple(course_names))
+        
+        score_threshold = 0.6  # Lower threshold for more results
+        
+        # Serve repeated queries from the result cache while the collection is unchanged
+        results = None
+        cache_key = None
+        if _search_cache is not None:
+            cache_key = (
+                EmbeddingCache.normalise(enhanced_query),
+                limit,
+                score_threshold,
+                tuple(sorted(filters.items())),
+                get_collection_version()
+            )
+            results = _get_cached_results(cache_key)
+        
+        if results is None:
+            # Search for similar document chunks
+            results = await search_similar_chunks(
+                query_text=enhanced_query,
+                limit=limit,
+                score_threshold=score_threshold,
+                filters=filters or None
+            )
+            
+            # Empty results may come from a transient error, so only cache hits
+            if results and cache_key is not None:
+                _search_cache.set(cache_key, results)
         
         if not results:
             return {
@@ -58,7 +203,8 @@ async def search_course_documents_async(
                 "message": f"No relevant documents found for query: '{query}'",
                 "documents": [],
                 "total_found": 0,
-                "query_used": enhanced_query
+                "query_used": enhanced_query,
+                "filters_used": filters
             }
         
         # Format results for LLM consumption
@@ -77,7 +223,8 @@ async def search_course_documents_async(
             "message": f"Found {len(results)} relevant documents",
             "documents": formatted_documents,
             "total_found": len(results),
-            "query_used": enhanced_query
+            "query_used": enhanced_query,
+            "filters_used": filters
         }
         
     except Exception as e:
@@ -93,9 +240,10 @@ async def search_course_documents_async(
         }
 
 
-async def search_eligibility_requirements_async(
+async def search_eligibility_requirements(
     student_background: str,
     program_name: str,
+    level: str = "",
     tool_context: ToolContext = None
 ) -> Dict[str, Any]:
     """
@@ -106,21 +254,30 @@ async def search_eligibility_requirements_async(
     
     Args:
         student_background: Student's academic background, qualifications, GPA, etc.
-        program_name: Name of the program/course the student is interested in
+        program_name: Name of the program/course the student is interested in; one of the
+            course names listed for search_course_documents restricts results to that programme
+            and the general admission documents
+        level: Optional programme level ("ug" or "pg"); restricts results to that level
+            plus general admission documents
         tool_context: ADK tool context (automatically provided)
         
     Returns:
         Dict containing eligibility information and requirements
     """
     try:
-        # Create targeted query for eligibility checking
+        # Create targeted query for eligibility checking (already names the program,
+        # so it is not appended again as a program filter)
         eligibility_query = f"eligibility requirements admission criteria {program_name} {student_background}"
         
+        # A known programme narrows the search to its own documents plus the general admission ones
+        course_names, _ = _resolve_course_names(program_name)
+        
         # Search for relevant documents
-        search_result = await search_course_documents_async(
+        search_result = await search_course_documents(
             query=eligibility_query,
-            program_filter=program_name,
-            limit=7,  # Get more results for comprehensive eligibility check
+            limit=5 if level or course_names else 7,  # Filters narrow results, so fewer are needed
+            level=f"{level},general" if level else "",
+            course_name=",".join([*course_names, *_ADMISSION_COURSE_NAMES]) if course_names else "",
             tool_context=tool_context
         )
         
@@ -161,8 +318,17 @@ async def search_eligibility_requirements_async(
         }
 
 
-# Synchronous wrapper functions for ADK agents
-def search_course_documents_sync(query: str, program_filter: str = "", limit: int = 5) -> str:
+# Synchronous wrapper functions for non-async callers (scripts, tests). They block on
+# the shared background loop, so they must not be called from a coroutine or tool
+# running on it (agent turns do); await the async tools there instead
+def search_course_documents_sync(
+    query: str,
+    program_filter: str = "",
+    limit: int = 5,
+    level: str = "",
+    content_type: str = "",
+    course_name: str = ""
+) -> str:
     """
     Search course documents and requirements using vector similarity.
     
@@ -172,8 +338,22 @@ def search_course_documents_sync(query: str, program_filter: str = "", limit: in
     
     Args:
         query: The search query describing what information is needed
-        program_filter: Optional filter to search within specific program/course (default: "")
+        program_filter: Optional programme name; used as the course_name filter when it is
+            one of the course names below, otherwise added to the query as a search hint (default: "")
         limit: Maximum number of relevant documents to return (default: 5)
+        level: Only return documents of this level: "ug", "pg" or "general";
+            comma-separate to allow several, e.g. "pg,general" (default: any)
+        content_type: Only return documents of this type: "overview", "financial",
+            "requirements", "career" or "facilities"; comma-separate to allow several (default: any)
+        course_name: Only return documents for these courses; comma-separate to allow several
+            (default: any). One of: "Course Catalog Overview",
+            "Bachelor Computer Science Software Engineering",
+            "Bachelor Computer Science Artificial Intelligence",
+            "Bachelor Business Administration Marketing", "Master Business Administration MBA",
+            "Bachelor Mechanical Engineering", "Bachelor Nursing", "Admission Requirements",
+            "Application Process & Deadlines", "Campus Facilities & Student Life",
+            "Scholarships & Financial Aid", "Career Services & Industry Partnerships".
+            Other names are added to the query as a search hint instead
         
     Returns:
         JSON string containing search results with documents, metadata, and status
@@ -181,32 +361,16 @@ def search_course_documents_sync(query: str, program_filter: str = "", limit: in
     Examples:
         - search_course_documents_sync("MBA programs")
         - search_course_documents_sync("admission requirements", "MBA", 3)
-        - search_course_documents_sync("fee structure")
+        - search_course_documents_sync("fee structure", content_type="financial", level="pg")
+        - search_course_documents_sync("fees", course_name="Bachelor Nursing", content_type="financial")
     """
     try:
-        # Use existing event loop if available, otherwise create new one
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # If event loop is running, create a new one in a thread
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(
-                        asyncio.run, 
-                        search_course_documents_async(query, program_filter, limit, None)
-                    )
-                    result = future.result()
-            else:
-                result = loop.run_until_complete(search_course_documents_async(query, program_filter, limit, None))
-        except RuntimeError:
-            # No event loop, create a new one
-            result = asyncio.run(search_course_documents_async(query, program_filter, limit, None))
+        # Run on the shared background loop instead of a new thread + event loop per call
+        result = run_sync(search_course_documents(query, program_filter, limit, level, content_type, course_name, None))
         
-        import json
-        return json.dumps(result, indent=2)
+        return dumps(result)
         
     except Exception as e:
-        import json
         error_result = {
             "status": "error",
             "message": f"Search error: {str(e)}",
@@ -214,10 +378,10 @@ def search_course_documents_sync(query: str, program_filter: str = "", limit: in
             "total_found": 0,
             "query_used": query
         }
-        return json.dumps(error_result, indent=2)
+        return dumps(error_result)
 
 
-def search_eligibility_requirements_sync(student_background: str, program_name: str) -> str:
+def search_eligibility_requirements_sync(student_background: str, program_name: str, level: str = "") -> str:
     """
     Search for specific eligibility requirements based on student background and target program.
     
@@ -227,6 +391,7 @@ def search_eligibility_requirements_sync(student_background: str, program_name:
     Args:
         student_background: Student's academic background, qualifications, GPA, etc.
         program_name: Name of the program/course the student is interested in
+        level: Optional programme level ("ug" or "pg") to narrow the search
         
     Returns:
         JSON string containing eligibility information and requirements
@@ -236,38 +401,16 @@ def search_eligibility_requirements_sync(student_background: str, program_name:
         - search_eligibility_requirements_sync("Bachelor Computer Science 3.5 GPA", "Master Data Science")
     """
     try:
-        # Use existing event loop if available, otherwise create new one
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # If event loop is running, create a new one in a thread
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(
-                        asyncio.run, 
-                        search_eligibility_requirements_async(student_background, program_name, None)
-                    )
-                    result = future.result()
-            else:
-                result = loop.run_until_complete(search_eligibility_requirements_async(student_background, program_name, None))
-        except RuntimeError:
-            # No event loop, create a new one
-            result = asyncio.run(search_eligibility_requirements_async(student_background, program_name, None))
+        # Run on the shared background loop instead of a new thread + event loop per call
+        result = run_sync(search_eligibility_requirements(student_background, program_name, level, None))
         
-        import json
-        return json.dumps(result, indent=2)
+        return dumps(result)
         
     except Exception as e:
-        import json
         error_result = {
             "status": "error",
             "message": f"Eligibility search error: {str(e)}",
             "program_name": program_name,
             "student_background": student_background
         }
-        return json.dumps(error_result, indent=2)
-
-
-# Export the synchronous functions for agent use
-search_course_documents = search_course_documents_sync
-search_eligibility_requirements = search_eligibility_requirements_sync 
\ No newline at end of file
+        return dumps(error_result)
@@ -0,0 +1,72 @@
+"""
+JSON Serialisation for KDM Tools
+
+This module provides the dumps/loads used for stored user data and for the
+JSON strings returned by the synchronous tool wrappers. In compact mode (the
+default) output has no indentation and no spaces after separators, and
+non-ASCII text is written as UTF-8 instead of \\u escapes. orjson is used as a
+fast path when it is installed.
+
+The async tools registered on agents return dicts, which ADK serialises
+itself, so dumps() does not shape what the model sees. drop_nulls() trims
+those dicts instead.
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Any, Optional, Union
+
+# Add parent directory to path to import config
+sys.path.append(str(Path(__file__).parent.parent))
+from config import SERIALIZATION_CONFIG
+
+try:
+    import orjson
+except ImportError:  # Optional dependency
+    orjson = None
+
+_USE_ORJSON = orjson is not None and SERIALIZATION_CONFIG["use_orjson"]
+
+
+def dumps(obj: Any, compact: Optional[bool] = None) -> str:
+    """
+    Serialise obj to a JSON string.
+
+    Args:
+        obj: JSON-compatible object
+        compact: Override SERIALIZATION_CONFIG["compact"]; False gives the
+            original indent=2 output for human-readable files
+
+    Returns:
+        JSON string
+    """
+    if compact is None:
+        compact = SERIALIZATION_CONFIG["compact"]
+
+    if not compact:
+        return json.dumps(obj, indent=2)
+
+    if _USE_ORJSON:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            pass  # e.g. non-string dict keys or integers beyond 64 bits; the stdlib handles these
+
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def drop_nulls(obj: Any) -> Any:
+    """Return obj with None-valued dict entries removed at every level (for payloads sent to the LLM)."""
+    if isinstance(obj, dict):
+        return {key: drop_nulls(value) for key, value in obj.items() if value is not None}
+    if isinstance(obj, list):
+        return [drop_nulls(value) for value in obj]
+    return obj
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parse a JSON string or UTF-8 bytes (raises json.JSONDecodeError on invalid input)."""
+    if _USE_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -1,27 +1,54 @@
 """
 User Data Management Tool for KDM Student Onboarding System
 
-This tool manages user data storage in a single JSON file with concurrent access handling
-and data completeness tracking. All agents use this tool to update and retrieve user information.
+This tool manages user data storage with concurrent access handling and data completeness
+tracking. All agents use this tool to update and retrieve user information. Storage is
+pluggable (see user_data_store.py): SQLite with one row per applicant by default, hash-bucketed
+JSON shard files, or the original single JSON file.
+
+The tools given to agents are async: storage I/O runs on a small thread pool so a slow
+write never stalls other sessions on the ADK runner's event loop. *_sync variants return
+JSON strings for callers outside an event loop.
 """
 
-import json
+import asyncio
+import copy
+import functools
 import os
-import time
-import platform
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, Any, Optional, List, Union
 from pathlib import Path
 
-# Platform-specific imports for file locking
-if platform.system() == "Windows":
-    import msvcrt
-else:
-    import fcntl
+from .cache import TTLCache
+from .serialization import drop_nulls, dumps, loads
+from .user_data_store import create_store
+
+# User data storage backend: "sqlite" (one row per applicant), "sharded" (hash-bucketed files) or "json" (single file)
+USER_DATA_BACKEND = os.getenv("USER_DATA_BACKEND", "sqlite").lower()
 
-# User data storage file
+# User data storage files
 USER_DATA_FILE = "user_data.json"
 USER_DATA_LOCK_FILE = "user_data.lock"
+USER_DATA_DB_FILE = "user_data.db"
+USER_DATA_SHARD_DIR = os.getenv("USER_DATA_SHARD_DIR", "user_data_shards")
+USER_DATA_SHARD_COUNT = int(os.getenv("USER_DATA_SHARD_COUNT", "256"))
+
+# Seconds to wait for the storage write lock before an update fails
+USER_DATA_LOCK_TIMEOUT = float(os.getenv("USER_DATA_LOCK_TIMEOUT", "30"))
+
+# Worker threads the async tools use for storage I/O
+USER_DATA_IO_WORKERS = int(os.getenv("USER_DATA_IO_WORKERS", "8"))
+
+# Number of per-phone-number lock stripes (applicants on different stripes never contend)
+USER_DATA_LOCK_STRIPES = int(os.getenv("USER_DATA_LOCK_STRIPES", "64"))
+
+# In-process profile cache; entries are revalidated against the store's change token on every read
+USER_PROFILE_CACHE_ENABLED = os.getenv("USER_PROFILE_CACHE_ENABLED", "true").lower() == "true"
+USER_PROFILE_CACHE_SIZE = int(os.getenv("USER_PROFILE_CACHE_SIZE", "1024"))
+USER_PROFILE_CACHE_TTL = float(os.getenv("USER_PROFILE_CACHE_TTL", "600"))
 
 # Required user data schema - what needs to be collected for complete application
 REQUIRED_USER_DATA = {
@@ -58,72 +85,92 @@ REQUIRED_USER_DATA = {
 }
 
 
+
+def _flatten_required_fields(required: Dict[str, Any], path: str = "") -> List[tuple]:
+    """Flatten REQUIRED_USER_DATA into (field_path, is_list) pairs in schema order."""
+    fields = []
+    for key, value in required.items():
+        current_path = f"{path}.{key}" if path else key
+        if isinstance(value, dict):
+            fields.extend(_flatten_required_fields(value, current_path))
+        else:
+            fields.append((current_path, isinstance(value, list)))
+    return fields
+
+
+# Precompiled required field paths; bit i of a user's completeness mask is set when field i is filled
+REQUIRED_FIELD_PATHS = _flatten_required_fields(REQUIRED_USER_DATA)
+_REQUIRED_FIELD_BITS = {field_path: bit for bit, (field_path, _) in enumerate(REQUIRED_FIELD_PATHS)}
+_ALL_FIELDS_MASK = (1 << len(REQUIRED_FIELD_PATHS)) - 1
+
+# Identifies the schema a stored mask was built against, so masks are rebuilt if the schema changes
+COMPLETENESS_SCHEMA_ID = zlib.crc32("|".join(path for path, _ in REQUIRED_FIELD_PATHS).encode("utf-8"))
+
+# Bookkeeping kept in each record's _metadata but never returned to agents
+_INTERNAL_METADATA_KEYS = ("completeness_mask", "completeness_schema")
+
+
 class UserDataManager:
     """Manages user data with concurrent access and completeness tracking."""
     
-    def __init__(self):
-        self.data_file = USER_DATA_FILE
-        self.lock_file = USER_DATA_LOCK_FILE
-        self._ensure_data_file_exists()
+    def __init__(self, backend: str = USER_DATA_BACKEND):
+        self.store = create_store(
+            backend,
+            USER_DATA_FILE,
+            USER_DATA_LOCK_FILE,
+            USER_DATA_DB_FILE,
+            lock_timeout=USER_DATA_LOCK_TIMEOUT,
+            lock_stripes=USER_DATA_LOCK_STRIPES,
+            shard_dir=USER_DATA_SHARD_DIR,
+            shard_count=USER_DATA_SHARD_COUNT
+        )
+        self._profile_cache = (
+            TTLCache(USER_PROFILE_CACHE_SIZE, USER_PROFILE_CACHE_TTL) if USER_PROFILE_CACHE_ENABLED else None
+        )
+        self._stale_reads = 0
+        self._stale_reads_lock = threading.Lock()
     
-    def _ensure_data_file_exists(self):
-        """Ensure the user data file exists."""
-        if not os.path.exists(self.data_file):
-            with open(self.data_file, 'w') as f:
-                json.dump({}, f, indent=2)
+    def get_profile_cache_stats(self) -> Dict[str, Any]:
+        """Return profile cache size, hit/miss counters and how many hits were stale."""
+        if self._profile_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self._profile_cache.stats(), "stale": self._stale_reads}
     
-    def _acquire_lock(self, timeout: int = 5) -> Optional[object]:
-        """Acquire file lock with timeout (cross-platform)."""
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            try:
-                lock_file = open(self.lock_file, 'w')
-                
-                if platform.system() == "Windows":
-                    # Windows file locking using msvcrt
-                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
-                else:
-                    # Unix/Linux file locking using fcntl
-                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
-                
-                return lock_file
-            except (IOError, OSError):
-                if 'lock_file' in locals():
-                    lock_file.close()
-                time.sleep(0.1)
-        return None
-    
-    def _release_lock(self, lock_file):
-        """Release file lock (cross-platform)."""
-        if lock_file:
-            try:
-                if platform.system() == "Windows":
-                    # Windows file unlocking
-                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
-                else:
-                    # Unix/Linux file unlocking
-                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
-            except (IOError, OSError):
-                pass  # Best effort release
-            
-            lock_file.close()
-            try:
-                os.remove(self.lock_file)
-            except OSError:
-                pass  # Lock file might already be removed
-    
-    def _load_data(self) -> Dict[str, Any]:
-        """Load user data from file."""
-        try:
-            with open(self.data_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+    def _load_profile(self, phone_number: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a user's record, serving it from the profile cache when still current.
+        
+        A cached entry is only used if the store's change token (SQLite row version,
+        or data file mtime for JSON) still matches, so writes made by other
+        processes are picked up on the next read.
+        """
+        if self._profile_cache is None:
+            user_data = self.store.get(phone_number)
+            if user_data is not None:
+                self._ensure_completeness_mask(user_data)
+            return user_data
+        
+        token = self.store.change_token(phone_number)
+        cached = self._profile_cache.get(phone_number)
+        if cached is not None:
+            cached_token, cached_data = cached
+            if token is not None and cached_token == token:
+                return copy.deepcopy(cached_data)
+            with self._stale_reads_lock:
+                self._stale_reads += 1
+        
+        # The token was read before the record, so a concurrent write can only make the entry stale, never wrong
+        user_data = self.store.get(phone_number)
+        if user_data is not None:
+            # Legacy records get their completeness mask computed once here, and persisted on the next write
+            self._ensure_completeness_mask(user_data)
+        if user_data is not None and token is not None:
+            self._profile_cache.set(phone_number, (token, copy.deepcopy(user_data)))
+        return user_data
     
-    def _save_data(self, data: Dict[str, Any]):
-        """Save user data to file."""
-        with open(self.data_file, 'w') as f:
-            json.dump(data, f, indent=2)
+    def get_lock_stats(self) -> Dict[str, Any]:
+        """Return lock wait-time metrics for the storage backend."""
+        return {"backend": self.store.name, **self.store.lock_stats()}
     
     def _initialize_user(self, phone_number: str) -> Dict[str, Any]:
         """Initialize a new user with the required data structure."""
@@ -153,47 +200,67 @@ class UserDataManager:
         
         return user_data
     
+    def _is_field_filled(self, user_data: Dict[str, Any], bit: int) -> bool:
+        """Return whether required field number bit has a value in user_data."""
+        field_path, is_list = REQUIRED_FIELD_PATHS[bit]
+        current = user_data
+        for key in field_path.split('.'):
+            if not isinstance(current, dict) or key not in current:
+                return False
+            current = current[key]
+        
+        if is_list:
+            return bool(current)
+        return current is not None and current != ""
+    
+    def _build_completeness_mask(self, user_data: Dict[str, Any]) -> int:
+        """Compute the completeness mask from scratch (new users and legacy records only)."""
+        mask = 0
+        for bit in range(len(REQUIRED_FIELD_PATHS)):
+            if self._is_field_filled(user_data, bit):
+                mask |= 1 << bit
+        return mask
+    
+    def _ensure_completeness_mask(self, user_data: Dict[str, Any]) -> None:
+        """Store a completeness mask in the record's metadata if it is missing or out of date."""
+        metadata = user_data.setdefault("_metadata", {})
+        if metadata.get("completeness_schema") != COMPLETENESS_SCHEMA_ID or "completeness_mask" not in metadata:
+            metadata["completeness_mask"] = self._build_completeness_mask(user_data)
+            metadata["completeness_schema"] = COMPLETENESS_SCHEMA_ID
+    
+    def _update_completeness_mask(self, user_data: Dict[str, Any], field_path: str) -> None:
+        """Refresh only the mask bits affected by a write to field_path."""
+        metadata = user_data["_metadata"]
+        bit = _REQUIRED_FIELD_BITS.get(field_path)
+        if bit is not None:
+            affected = (bit,)
+        else:
+            # A whole section (or a value nested below a required field) was written
+            prefix = field_path + "."
+            affected = tuple(
+                bit for bit, (required_path, _) in enumerate(REQUIRED_FIELD_PATHS)
+                if required_path.startswith(prefix) or field_path.startswith(required_path + ".")
+            )
+        
+        mask = metadata["completeness_mask"]
+        for bit in affected:
+            if self._is_field_filled(user_data, bit):
+                mask |= 1 << bit
+            else:
+                mask &= ~(1 << bit)
+        metadata["completeness_mask"] = mask
+    
     def _calculate_completeness(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Calculate data completeness score and identify missing fields."""
-        def check_completeness(required, actual, path=""):
-            total_fields = 0
-            completed_fields = 0
-            missing_fields = []
-            
-            for key, value in required.items():
-                current_path = f"{path}.{key}" if path else key
-                
-                if isinstance(value, dict):
-                    if key in actual and isinstance(actual[key], dict):
-                        sub_total, sub_completed, sub_missing = check_completeness(
-                            value, actual[key], current_path
-                        )
-                        total_fields += sub_total
-                        completed_fields += sub_completed
-                        missing_fields.extend(sub_missing)
-                    else:
-                        # Entire section missing
-                        sub_total, _, sub_missing = check_completeness(value, {}, current_path)
-                        total_fields += sub_total
-                        missing_fields.extend(sub_missing)
-                elif isinstance(value, list):
-                    total_fields += 1
-                    if key in actual and actual[key] and len(actual[key]) > 0:
-                        completed_fields += 1
-                    else:
-                        missing_fields.append(current_path)
-                else:
-                    total_fields += 1
-                    if key in actual and actual[key] is not None and actual[key] != "":
-                        completed_fields += 1
-                    else:
-                        missing_fields.append(current_path)
-            
-            return total_fields, completed_fields, missing_fields
+        """Return the completeness score and missing fields from the record's completeness mask."""
+        self._ensure_completeness_mask(user_data)
+        mask = user_data["_metadata"]["completeness_mask"] & _ALL_FIELDS_MASK
         
-        # Calculate completeness excluding metadata
-        user_data_copy = {k: v for k, v in user_data.items() if not k.startswith('_')}
-        total, completed, missing = check_completeness(REQUIRED_USER_DATA, user_data_copy)
+        total = len(REQUIRED_FIELD_PATHS)
+        completed = bin(mask).count("1")
+        missing = [
+            field_path for bit, (field_path, _) in enumerate(REQUIRED_FIELD_PATHS)
+            if not mask & (1 << bit)
+        ]
         
         completeness_score = completed / total if total > 0 else 0
         
@@ -237,36 +304,60 @@ class UserDataManager:
         Returns:
             Dict with update status and completeness information
         """
-        # Acquire file lock
-        lock_file = self._acquire_lock()
-        if not lock_file:
+        return self.update_user_data_bulk(phone_number, {field_path: value}, agent_id)
+    
+    def update_user_data_bulk(
+        self,
+        phone_number: str,
+        updates: Dict[str, Any],
+        agent_id: str
+    ) -> Dict[str, Any]:
+        """
+        Update several fields in one read-modify-write of the user's record.
+        
+        All field paths are applied together under a single lock/transaction, the
+        version is incremented once and completeness is calculated once.
+        
+        Args:
+            phone_number: User's phone number (primary identifier)
+            updates: Mapping of dot notation field paths to values
+            agent_id: ID of the agent making the update
+            
+        Returns:
+            Dict with update status and completeness information
+        """
+        if not updates:
             return {
                 "success": False,
-                "error": "Could not acquire file lock",
+                "error": "No field updates provided",
                 "completeness_score": 0,
                 "missing_fields": []
             }
         
-        try:
-            # Load current data
-            all_data = self._load_data()
-            
+        def apply_updates(user_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
             # Initialize user if not exists
-            if phone_number not in all_data:
-                all_data[phone_number] = self._initialize_user(phone_number)
-            
-            user_data = all_data[phone_number]
+            if user_data is None:
+                user_data = self._initialize_user(phone_number)
+            self._ensure_completeness_mask(user_data)
             
-            # Update the specific field
-            self._set_nested_value(user_data, field_path, value)
+            # Update every requested field and the completeness bits it affects
+            for field_path, value in updates.items():
+                self._set_nested_value(user_data, field_path, value)
+                self._update_completeness_mask(user_data, field_path)
             
             # Update metadata
             user_data["_metadata"]["last_updated"] = datetime.now().isoformat()
             user_data["_metadata"]["last_updated_by"] = agent_id
             user_data["_metadata"]["version"] += 1
+            return user_data
+        
+        try:
+            # Read-modify-write the user's record atomically in the storage backend
+            user_data, token = self.store.update(phone_number, apply_updates, changes=updates)
             
-            # Save data
-            self._save_data(all_data)
+            # Write-through so the next read is served from memory
+            if self._profile_cache is not None and token is not None:
+                self._profile_cache.set(phone_number, (token, copy.deepcopy(user_data)))
             
             # Calculate completeness
             completeness_info = self._calculate_completeness(user_data)
@@ -274,6 +365,7 @@ class UserDataManager:
             return {
                 "success": True,
                 "user_exists": True,
+                "fields_updated": list(updates.keys()),
                 **completeness_info
             }
             
@@ -284,8 +376,6 @@ class UserDataManager:
                 "completeness_score": 0,
                 "missing_fields": []
             }
-        finally:
-            self._release_lock(lock_file)
     
     def get_user_data(self, phone_number: str) -> Dict[str, Any]:
         """
@@ -297,18 +387,10 @@ class UserDataManager:
         Returns:
             Dict with user data and completeness information
         """
-        lock_file = self._acquire_lock()
-        if not lock_file:
-            return {
-                "success": False,
-                "error": "Could not acquire file lock",
-                "user_data": None
-            }
-        
         try:
-            all_data = self._load_data()
+            user_data = self._load_profile(phone_number)
             
-            if phone_number not in all_data:
+            if user_data is None:
                 return {
                     "success": True,
                     "user_exists": False,
@@ -317,9 +399,12 @@ class UserDataManager:
                     "missing_fields": list(REQUIRED_USER_DATA.keys())
                 }
             
-            user_data = all_data[phone_number]
             completeness_info = self._calculate_completeness(user_data)
             
+            # _load_profile returns a private copy, so the stored mask is unaffected
+            for key in _INTERNAL_METADATA_KEYS:
+                user_data["_metadata"].pop(key, None)
+            
             return {
                 "success": True,
                 "user_exists": True,
@@ -333,16 +418,35 @@ class UserDataManager:
                 "error": str(e),
                 "user_data": None
             }
-        finally:
-            self._release_lock(lock_file)
 
 
 # Global instance
 _user_data_manager = UserDataManager()
 
 
-# ADK-compatible functions for agents
-def update_user_data(phone_number: str, field_path: str, value: str, agent_id: str) -> str:
+# Thread pool for storage I/O, so the async tools never block the ADK runner's event loop
+_io_executor = ThreadPoolExecutor(max_workers=USER_DATA_IO_WORKERS, thread_name_prefix="user-data-io")
+
+
+async def _run_in_io_thread(func, *args):
+    """Run a blocking UserDataManager call on the storage I/O thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, functools.partial(func, *args))
+
+
+def _parse_updates_json(updates_json: str) -> Union[Dict[str, Any], str]:
+    """Parse the bulk updates argument, returning the updates dict or an error message."""
+    try:
+        updates = loads(updates_json)
+    except (TypeError, ValueError) as e:
+        return f"updates_json is not valid JSON: {e}"
+    if not isinstance(updates, dict):
+        return "updates_json must be a JSON object mapping field paths to values"
+    return updates
+
+
+# ADK-compatible async functions for agents (ADK declares each tool under its function name)
+async def update_user_data(phone_number: str, field_path: str, value: str, agent_id: str) -> Dict[str, Any]:
     """
     Update user data for a specific field.
     
@@ -356,27 +460,95 @@ def update_user_data(phone_number: str, field_path: str, value: str, agent_id: s
         agent_id: Your agent identifier for tracking
         
     Returns:
-        JSON string with update status and completeness information
+        Dict with update status and completeness information
     """
-    result = _user_data_manager.update_user_data(phone_number, field_path, value, agent_id)
-    return json.dumps(result)
+    return await _run_in_io_thread(_user_data_manager.update_user_data, phone_number, field_path, value, agent_id)
 
 
-def get_user_data(phone_number: str) -> str:
+async def update_user_data_bulk(phone_number: str, updates_json: str, agent_id: str) -> Dict[str, Any]:
     """
-    Retrieve complete user data and completeness status.
+    Update several user data fields at once.
+    
+    Prefer this over repeated update_user_data calls when storing many fields
+    extracted from the same document or answer; all fields are saved together.
+    
+    Args:
+        phone_number: User's phone number (primary identifier)
+        updates_json: JSON object mapping dot notation field paths to values
+                      (e.g., '{"personal_info.full_name": "John Smith", "personal_info.email": "john@example.com"}')
+        agent_id: Your agent identifier for tracking
+        
+    Returns:
+        Dict with update status and completeness information
+    """
+    # Taken as a JSON string: a free-form object parameter has no properties to
+    # declare, which Gemini rejects in function declarations
+    updates = _parse_updates_json(updates_json)
+    if isinstance(updates, str):
+        return {"success": False, "error": updates}
+    return await _run_in_io_thread(_user_data_manager.update_user_data_bulk, phone_number, updates, agent_id)
+
+
+def _trim_profile(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop unfilled (null) fields from a get_user_data result; missing_fields already lists them."""
+    if result.get("user_data"):
+        result["user_data"] = drop_nulls(result["user_data"])
+    return result
+
+
+async def get_user_data(phone_number: str) -> Dict[str, Any]:
+    """
+    Retrieve collected user data and completeness status.
     
     Use this to check what information is already collected and what's missing
-    before deciding on next steps or routing to other agents.
+    before deciding on next steps or routing to other agents. Fields not yet
+    collected are omitted from user_data and listed in missing_fields.
     
     Args:
         phone_number: User's phone number (primary identifier)
         
+    Returns:
+        Dict with user data and completeness information
+    """
+    result = await _run_in_io_thread(_user_data_manager.get_user_data, phone_number)
+    return _trim_profile(result)
+
+
+# Synchronous versions returning JSON strings, for callers outside an event loop
+def update_user_data_sync(phone_number: str, field_path: str, value: str, agent_id: str) -> str:
+    """
+    Update user data for a specific field (synchronous version of update_user_data).
+    
+    Returns:
+        JSON string with update status and completeness information
+    """
+    result = _user_data_manager.update_user_data(phone_number, field_path, value, agent_id)
+    return dumps(result)
+
+
+def update_user_data_bulk_sync(phone_number: str, updates_json: str, agent_id: str) -> str:
+    """
+    Update several user data fields at once (synchronous version of update_user_data_bulk).
+    
+    Returns:
+        JSON string with update status and completeness information
+    """
+    updates = _parse_updates_json(updates_json)
+    if isinstance(updates, str):
+        return dumps({"success": False, "error": updates})
+    result = _user_data_manager.update_user_data_bulk(phone_number, updates, agent_id)
+    return dumps(result)
+
+
+def get_user_data_sync(phone_number: str) -> str:
+    """
+    Retrieve complete user data and completeness status (synchronous version of get_user_data).
+    
     Returns:
         JSON string with user data and completeness information
     """
     result = _user_data_manager.get_user_data(phone_number)
-    return json.dumps(result)
+    return dumps(_trim_profile(result))
 
 
 def get_required_data_schema() -> str:
@@ -388,4 +560,4 @@ def get_required_data_schema() -> str:
     Returns:
         JSON string with the required data structure
     """
-    return json.dumps(REQUIRED_USER_DATA, indent=2) 
\ No newline at end of file
+    return dumps(REQUIRED_USER_DATA)
@@ -0,0 +1,749 @@
+"""
+User Data Storage Backends for KDM Student Onboarding System
+
+This module provides the storage layer behind UserDataManager. Every backend
+exposes the same operations:
+
+- get(phone_number): return one user's record (or None)
+- update(phone_number, mutate): atomically read-modify-write one user's record,
+  returning (record, change_token)
+- change_token(phone_number): a cheap value that changes whenever the user's
+  stored record may have changed (used to validate cached profiles)
+
+Backends:
+- JSONFileStore: all applicants in a single JSON file (original layout), with
+  an append-only change journal and atomic snapshot rewrites
+- SQLiteStore: one row per phone number with a JSON column per section,
+  using WAL mode so readers never block writers and per-phone striped locks
+  so updates for different applicants never wait on each other
+- ShardedFileStore: hash-bucketed JSON shard files plus a phone-number index,
+  so each update rewrites one small file and shards can be backed up alone
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .locks import InterProcessLock, LockStats, StripedLock
+from .serialization import dumps, loads
+
+# Mutation callback: receives the current record (None for a new user) and returns the new record
+Mutator = Callable[[Optional[Dict[str, Any]]], Dict[str, Any]]
+
+
+def _set_path(data: Dict[str, Any], field_path: str, value: Any) -> None:
+    """Set a value in a nested dictionary using dot notation."""
+    keys = field_path.split('.')
+    current = data
+    for key in keys[:-1]:
+        current = current.setdefault(key, {})
+    current[keys[-1]] = value
+
+
+class StoreCorruptedError(RuntimeError):
+    """Raised when a stored data file cannot be parsed (instead of treating it as empty)."""
+
+
+def _fsync_directory(path: str) -> None:
+    """Flush a directory entry so a rename inside it survives a crash (no-op where unsupported)."""
+    try:
+        fd = os.open(path or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _atomic_write_json(path: str, data: Any) -> None:
+    """Write data to a temporary file, fsync it and atomically rename it over path."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(dumps(data))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+class JSONFileStore:
+    """
+    Stores every user in one JSON snapshot plus an append-only change journal.
+
+    Each update appends one line to the journal (the changed field paths and the
+    new metadata, or the full record for a new user) and fsyncs it, instead of
+    rewriting every applicant. The journal is replayed on top of the snapshot
+    when loading and folded into a new snapshot, written to a temporary file and
+    atomically renamed, once it grows past checkpoint_bytes. Every process
+    keeps the parsed state in memory and only reads journal lines appended since
+    its last look.
+    """
+
+    name = "json"
+
+    def __init__(
+        self,
+        data_file: str,
+        lock_file: str,
+        lock_timeout: float = 30.0,
+        checkpoint_bytes: int = 1024 * 1024
+    ):
+        self.data_file = data_file
+        self.lock_file = lock_file
+        self.journal_file = f"{data_file}.journal"
+        self.checkpoint_bytes = checkpoint_bytes
+        self._lock = InterProcessLock(lock_file, timeout=lock_timeout)
+
+        # In-memory view of snapshot + journal, valid while the snapshot is unchanged
+        self._data: Dict[str, Any] = {}
+        self._snapshot_token: Optional[Hashable] = None
+        self._journal_offset = 0
+
+        self._ensure_data_file_exists()
+
+    def _ensure_data_file_exists(self):
+        """Ensure the user data file exists."""
+        with self._lock:
+            if not os.path.exists(self.data_file):
+                _atomic_write_json(self.data_file, {})
+
+    def _stat_token(self, path: str) -> Optional[Hashable]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _load_data(self) -> Dict[str, Any]:
+        """Load the snapshot file (a missing file is empty; an unreadable one is an error)."""
+        try:
+            with open(self.data_file, 'rb') as f:
+                return loads(f.read())
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            raise StoreCorruptedError(f"User data file {self.data_file} is corrupted: {e}") from e
+
+    @staticmethod
+    def _apply_entry(data: Dict[str, Any], entry: Dict[str, Any]) -> None:
+        """Apply one journal entry; entries not newer than the stored record are skipped."""
+        phone_number = entry["phone"]
+        current = data.get(phone_number)
+        current_version = current.get("_metadata", {}).get("version", 0) if current else 0
+        if current is not None and entry["version"] <= current_version:
+            return
+
+        if "record" in entry:
+            data[phone_number] = entry["record"]
+            return
+
+        record = current if current is not None else {}
+        for field_path, value in entry["changes"].items():
+            _set_path(record, field_path, value)
+        record["_metadata"] = entry["metadata"]
+        data[phone_number] = record
+
+    def _refresh(self) -> None:
+        """Bring the in-memory view up to date with the snapshot and journal (lock must be held)."""
+        snapshot_token = self._stat_token(self.data_file)
+        if snapshot_token != self._snapshot_token:
+            self._data = self._load_data()
+            self._snapshot_token = snapshot_token
+            self._journal_offset = 0
+
+        try:
+            journal = open(self.journal_file, 'rb')
+        except FileNotFoundError:
+            self._journal_offset = 0
+            return
+
+        with journal:
+            journal.seek(self._journal_offset)
+            for line in journal:
+                if not line.endswith(b"\n"):
+                    # Torn tail from a crash mid-append: drop it so the next append starts on a clean line
+                    with open(self.journal_file, 'r+b') as f:
+                        f.truncate(self._journal_offset)
+                    break
+                try:
+                    entry = loads(line)
+                except json.JSONDecodeError as e:
+                    raise StoreCorruptedError(
+                        f"Journal {self.journal_file} is corrupted at byte {self._journal_offset}: {e}"
+                    ) from e
+                self._apply_entry(self._data, entry)
+                self._journal_offset += len(line)
+
+    def _append_journal(self, entry: Dict[str, Any]) -> None:
+        line = (dumps(entry, compact=True) + "\n").encode("utf-8")
+        with open(self.journal_file, 'ab') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_offset += len(line)
+
+    def _checkpoint(self) -> None:
+        """Fold the journal into a new snapshot (lock must be held)."""
+        _atomic_write_json(self.data_file, self._data)
+        # A crash between these two steps only leaves entries that replay as no-ops
+        with open(self.journal_file, 'wb') as f:
+            os.fsync(f.fileno())
+        self._snapshot_token = self._stat_token(self.data_file)
+        self._journal_offset = 0
+
+    def checkpoint(self) -> None:
+        """Write a fresh snapshot containing every journalled change and empty the journal."""
+        with self._lock:
+            self._refresh()
+            self._checkpoint()
+
+    def lock_stats(self) -> Dict[str, Any]:
+        """Return wait-time metrics for the file lock."""
+        return self._lock.stats.as_dict()
+
+    def load_all(self) -> Dict[str, Any]:
+        """Return every stored user keyed by phone number."""
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._data)
+
+    def get(self, phone_number: str) -> Optional[Dict[str, Any]]:
+        """Return one user's record, or None if the user does not exist."""
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._data.get(phone_number))
+
+    def change_token(self, phone_number: str) -> Optional[Hashable]:
+        """Return the snapshot and journal file stats; any write to any user changes them."""
+        snapshot_token = self._stat_token(self.data_file)
+        if snapshot_token is None:
+            return None
+        return (snapshot_token, self._stat_token(self.journal_file))
+
+    def update(
+        self,
+        phone_number: str,
+        mutate: Mutator,
+        changes: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], Optional[Hashable]]:
+        """
+        Apply mutate to one user's record under the file lock and journal the result.
+
+        Args:
+            phone_number: User's phone number
+            mutate: Callback producing the new record from the current one
+            changes: Field paths written by mutate; journalled instead of the whole
+                record when the user already exists
+        """
+        with self._lock:
+            self._refresh()
+            current = self._data.get(phone_number)
+            user_data = mutate(copy.deepcopy(current))
+
+            version = user_data.get("_metadata", {}).get("version", 0)
+            if current is None or changes is None:
+                entry = {"phone": phone_number, "version": version, "record": user_data}
+            else:
+                entry = {
+                    "phone": phone_number,
+                    "version": version,
+                    "agent_id": user_data["_metadata"].get("last_updated_by"),
+                    "changes": changes,
+                    "metadata": user_data["_metadata"]
+                }
+            self._append_journal(entry)
+            self._data[phone_number] = copy.deepcopy(user_data)
+
+            if self._journal_offset >= self.checkpoint_bytes:
+                self._checkpoint()
+            return user_data, self.change_token(phone_number)
+
+
+def read_json_store(json_file: str) -> Dict[str, Any]:
+    """Read a JSONFileStore's users without locking: the snapshot plus any journalled changes."""
+    with open(json_file, 'rb') as f:
+        all_data = loads(f.read())
+    # Include changes journalled by JSONFileStore since its last checkpoint
+    journal_file = f"{json_file}.journal"
+    if os.path.exists(journal_file):
+        with open(journal_file, 'rb') as f:
+            for line in f:
+                if line.endswith(b"\n"):
+                    JSONFileStore._apply_entry(all_data, loads(line))
+    return all_data
+
+
+class SQLiteStore:
+    """
+    Stores each user as one SQLite row with a JSON column per data section.
+
+    Runs in WAL mode so reads never block on writes, and each update only
+    rewrites the affected user's row. The read-modify-write for a user is
+    serialised by that user's lock stripe; SQLite's database-wide write lock is
+    only held for the final single-row write, which only goes ahead if the
+    row's version is still the one that was read. Correctness therefore does
+    not depend on every process hashing users to the same stripe.
+    """
+
+    name = "sqlite"
+
+    # Top-level keys that get their own column; anything else goes into "extra"
+    SECTION_COLUMNS = (
+        "personal_info",
+        "academic_background",
+        "program_preferences",
+        "eligibility_status",
+        "application_status"
+    )
+
+    def __init__(
+        self,
+        db_file: str,
+        busy_timeout: float = 30.0,
+        import_json_file: Optional[str] = None,
+        lock_dir: Optional[str] = None,
+        lock_stripes: int = 64
+    ):
+        self.db_file = db_file
+        self.busy_timeout = busy_timeout
+        self._stripes = StripedLock(lock_dir or f"{db_file}.locks", stripes=lock_stripes, timeout=busy_timeout)
+        self._local = threading.local()
+        self._write_lock_stats = LockStats()
+        self.write_conflicts = 0
+        self._write_conflicts_lock = threading.Lock()
+        self._create_schema()
+
+        if import_json_file:
+            self._import_json_file(import_json_file)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are not shared across threads)."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_file, timeout=self.busy_timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self):
+        section_columns = ", ".join(f"{column} TEXT" for column in self.SECTION_COLUMNS)
+        self._connect().execute(
+            f"CREATE TABLE IF NOT EXISTS users ("
+            f"phone_number TEXT PRIMARY KEY, {section_columns}, "
+            f"extra TEXT, metadata TEXT, version INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def _import_json_file(self, json_file: str):
+        """One-off migration: copy users from a legacy JSON file into an empty database."""
+        if not os.path.exists(json_file):
+            return
+
+        connection = self._connect()
+        if connection.execute("SELECT COUNT(*) FROM users").fetchone()[0] > 0:
+            return
+
+        try:
+            all_data = read_json_store(json_file)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Could not import users from {json_file}: {e}")
+            return
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for phone_number, user_data in all_data.items():
+                self._write_row(connection, phone_number, user_data)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        print(f"Imported {len(all_data)} users from {json_file} into {self.db_file}")
+
+    def _row_to_record(self, row) -> Dict[str, Any]:
+        """Rebuild a user record from a users row."""
+        record = {}
+        for column, value in zip(self.SECTION_COLUMNS, row):
+            if value is not None:
+                record[column] = loads(value)
+        extra, metadata = row[len(self.SECTION_COLUMNS):len(self.SECTION_COLUMNS) + 2]
+        if extra:
+            record.update(loads(extra))
+        if metadata:
+            record["_metadata"] = loads(metadata)
+        return record
+
+    @staticmethod
+    def _record_version(user_data: Dict[str, Any]) -> int:
+        metadata = user_data.get("_metadata")
+        return metadata.get("version", 0) if isinstance(metadata, dict) else 0
+
+    def _write_row(self, connection: sqlite3.Connection, phone_number: str, user_data: Dict[str, Any]):
+        """Insert or replace the row for one user."""
+        sections = [
+            dumps(user_data[column], compact=True) if column in user_data else None
+            for column in self.SECTION_COLUMNS
+        ]
+        extra = {
+            key: value for key, value in user_data.items()
+            if key not in self.SECTION_COLUMNS and key != "_metadata"
+        }
+        metadata = user_data.get("_metadata")
+        version = self._record_version(user_data)
+
+        placeholders = ", ".join("?" for _ in range(len(self.SECTION_COLUMNS) + 4))
+        connection.execute(
+            f"INSERT OR REPLACE INTO users (phone_number, {', '.join(self.SECTION_COLUMNS)}, extra, metadata, version) "
+            f"VALUES ({placeholders})",
+            (
+                phone_number,
+                *sections,
+                dumps(extra, compact=True) if extra else None,
+                dumps(metadata, compact=True) if metadata is not None else None,
+                version
+            )
+        )
+
+    def _select_row(self, connection: sqlite3.Connection, phone_number: str):
+        """Return the user's section columns, extra, metadata and version (last)."""
+        return connection.execute(
+            f"SELECT {', '.join(self.SECTION_COLUMNS)}, extra, metadata, version FROM users WHERE phone_number = ?",
+            (phone_number,)
+        ).fetchone()
+
+    def _begin_immediate(self, connection: sqlite3.Connection):
+        """Start a write transaction, recording how long we waited for SQLite's write lock."""
+        start = time.monotonic()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            self._write_lock_stats.record(time.monotonic() - start, acquired=False, contended=True)
+            raise
+        wait_seconds = time.monotonic() - start
+        # SQLite does not report contention directly; a noticeable wait means we were queued
+        self._write_lock_stats.record(wait_seconds, acquired=True, contended=wait_seconds > 0.001)
+
+    def lock_stats(self) -> Dict[str, Any]:
+        """Return wait-time metrics for the per-user stripes and SQLite's write lock."""
+        return {
+            "stripes": self._stripes.stripes,
+            **self._stripes.stats.as_dict(),
+            "sqlite_write_lock": self._write_lock_stats.as_dict(),
+            "write_conflicts": self.write_conflicts
+        }
+
+    def load_all(self) -> Dict[str, Any]:
+        """Return every stored user keyed by phone number."""
+        rows = self._connect().execute(
+            f"SELECT phone_number, {', '.join(self.SECTION_COLUMNS)}, extra, metadata FROM users"
+        ).fetchall()
+        return {row[0]: self._row_to_record(row[1:]) for row in rows}
+
+    def get(self, phone_number: str) -> Optional[Dict[str, Any]]:
+        """Return one user's record, or None if the user does not exist."""
+        row = self._select_row(self._connect(), phone_number)
+        return self._row_to_record(row) if row else None
+
+    def change_token(self, phone_number: str) -> Optional[Hashable]:
+        """Return the user's stored version (an indexed lookup, no JSON parsing)."""
+        row = self._connect().execute(
+            "SELECT version FROM users WHERE phone_number = ?", (phone_number,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def update(
+        self,
+        phone_number: str,
+        mutate: Mutator,
+        changes: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], Optional[Hashable]]:
+        """
+        Apply mutate to one user's row under that user's lock stripe (changes is unused: rows are small).
+
+        The row is written only if its version is unchanged since it was read;
+        otherwise (a writer that locked a different stripe, e.g. a process with
+        another USER_DATA_LOCK_STRIPES) the row is re-read and mutate runs again.
+        """
+        with self._stripes.for_key(phone_number):
+            connection = self._connect()
+            while True:
+                row = self._select_row(connection, phone_number)
+                read_version = row[-1] if row else None
+                user_data = mutate(self._row_to_record(row) if row else None)
+
+                self._begin_immediate(connection)
+                try:
+                    current = connection.execute(
+                        "SELECT version FROM users WHERE phone_number = ?", (phone_number,)
+                    ).fetchone()
+                    if (current[0] if current else None) != read_version:
+                        connection.execute("ROLLBACK")
+                        with self._write_conflicts_lock:
+                            self.write_conflicts += 1
+                        continue
+                    self._write_row(connection, phone_number, user_data)
+                    connection.execute("COMMIT")
+                except Exception:
+                    connection.execute("ROLLBACK")
+                    raise
+                return user_data, self._record_version(user_data)
+
+
+class ShardedFileStore:
+    """
+    Stores users in hash-bucketed JSON shard files under one directory.
+
+    A phone number always maps to the same shard (crc32 modulo the shard count),
+    so an update locks and rewrites one small shard file instead of every
+    applicant. index.json records which shard holds each phone number; it is
+    only rewritten when a new user is added, and lets the store list users and
+    restore shards without opening every file. Shard files are written to a
+    temporary file and atomically renamed, and can be backed up or restored
+    one at a time.
+    """
+
+    name = "sharded"
+
+    INDEX_FILE = "index.json"
+
+    def __init__(
+        self,
+        directory: str,
+        shard_count: int = 256,
+        lock_timeout: float = 30.0,
+        import_json_file: Optional[str] = None
+    ):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.index_file = os.path.join(directory, self.INDEX_FILE)
+        self._index_lock = InterProcessLock(os.path.join(directory, "index.lock"), timeout=lock_timeout)
+
+        # An existing layout keeps the shard count it was created with
+        index = self._read_index()
+        if index is not None and index["shards"] != shard_count:
+            print(f"Using {index['shards']} shards from {self.index_file} (configured: {shard_count})")
+            shard_count = index["shards"]
+        self.shard_count = shard_count
+        self._shard_locks = StripedLock(os.path.join(directory, "locks"), stripes=shard_count, timeout=lock_timeout)
+
+        if index is None:
+            with self._index_lock:
+                if self._read_index() is None:
+                    self._write_index({})
+        if import_json_file:
+            self._import_json_file(import_json_file)
+
+    def shard_for(self, phone_number: str) -> int:
+        """Return the shard number holding phone_number."""
+        return self._shard_locks.stripe_for(phone_number)
+
+    def shard_path(self, shard: int) -> str:
+        return os.path.join(self.directory, f"shard-{shard:04d}.json")
+
+    def _read_index(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.index_file, 'rb') as f:
+                return loads(f.read())
+        except FileNotFoundError:
+            return None
+        except json.JSONDecodeError as e:
+            raise StoreCorruptedError(f"Shard index {self.index_file} is corrupted: {e}") from e
+
+    def _write_index(self, users: Dict[str, int]) -> None:
+        _atomic_write_json(self.index_file, {"shards": self.shard_count, "users": users})
+
+    def _index_users(self, phone_shards: Dict[str, int]) -> None:
+        """Add phone -> shard entries to the index (only called for users not yet indexed)."""
+        with self._index_lock:
+            index = self._read_index() or {"users": {}}
+            users = index["users"]
+            users.update(phone_shards)
+            self._write_index(users)
+
+    def _read_shard(self, shard: int) -> Dict[str, Any]:
+        path = self.shard_path(shard)
+        try:
+            with open(path, 'rb') as f:
+                return loads(f.read())
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            raise StoreCorruptedError(f"User data shard {path} is corrupted: {e}") from e
+
+    def _import_json_file(self, json_file: str):
+        """One-off migration: copy users from a legacy JSON file into an empty shard directory."""
+        if not os.path.exists(json_file) or self._existing_shards():
+            return
+
+        # Held for the whole import so concurrently starting processes import only once
+        with self._index_lock:
+            if self._existing_shards():
+                return
+
+            try:
+                all_data = read_json_store(json_file)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Could not import users from {json_file}: {e}")
+                return
+
+            shards: Dict[int, Dict[str, Any]] = {}
+            for phone_number, user_data in all_data.items():
+                shards.setdefault(self.shard_for(phone_number), {})[phone_number] = user_data
+            for shard, users in shards.items():
+                with self._shard_locks.for_stripe(shard):
+                    _atomic_write_json(self.shard_path(shard), {**self._read_shard(shard), **users})
+            self._write_index({phone_number: self.shard_for(phone_number) for phone_number in all_data})
+        print(f"Imported {len(all_data)} users from {json_file} into {len(shards)} shards in {self.directory}")
+
+    def lock_stats(self) -> Dict[str, Any]:
+        """Return wait-time metrics for the per-shard locks."""
+        return {"shards": self.shard_count, **self._shard_locks.stats.as_dict()}
+
+    def _existing_shards(self) -> List[int]:
+        """Return the numbers of all shard files on disk (the shard files, not the index, are authoritative)."""
+        shards = []
+        for file_name in os.listdir(self.directory):
+            if file_name.startswith("shard-") and file_name.endswith(".json"):
+                shards.append(int(file_name[len("shard-"):-len(".json")]))
+        return sorted(shards)
+
+    def list_users(self) -> Dict[str, int]:
+        """Return the phone number -> shard index without opening any shard."""
+        return self._read_index()["users"]
+
+    def rebuild_index(self) -> int:
+        """Rebuild index.json from the shard files (e.g. after copying shards in by hand)."""
+        users = {}
+        for shard in self._existing_shards():
+            users.update({phone_number: shard for phone_number in self._read_shard(shard)})
+        with self._index_lock:
+            self._write_index(users)
+        return len(users)
+
+    def load_all(self) -> Dict[str, Any]:
+        """Return every stored user keyed by phone number."""
+        all_data = {}
+        for shard in self._existing_shards():
+            all_data.update(self._read_shard(shard))
+        return all_data
+
+    def get(self, phone_number: str) -> Optional[Dict[str, Any]]:
+        """Return one user's record, or None if the user does not exist."""
+        # Shard files are replaced atomically, so reads need no lock
+        return self._read_shard(self.shard_for(phone_number)).get(phone_number)
+
+    def change_token(self, phone_number: str) -> Optional[Hashable]:
+        """Return the user's shard file mtime/size/inode; only writes to that shard change it."""
+        try:
+            stat = os.stat(self.shard_path(self.shard_for(phone_number)))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def update(
+        self,
+        phone_number: str,
+        mutate: Mutator,
+        changes: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], Optional[Hashable]]:
+        """Apply mutate to one user's record under its shard lock and rewrite only that shard."""
+        shard = self.shard_for(phone_number)
+        with self._shard_locks.for_key(phone_number):
+            users = self._read_shard(shard)
+            is_new_user = phone_number not in users
+            user_data = mutate(users.get(phone_number))
+            users[phone_number] = user_data
+            _atomic_write_json(self.shard_path(shard), users)
+            token = self.change_token(phone_number)
+
+        if is_new_user:
+            self._index_users({phone_number: shard})
+        return user_data, token
+
+    def backup_shard(self, shard: int, destination_dir: str) -> str:
+        """
+        Copy one shard to destination_dir while holding its lock.
+
+        Returns:
+            Path of the backup file
+        """
+        os.makedirs(destination_dir, exist_ok=True)
+        destination = os.path.join(destination_dir, os.path.basename(self.shard_path(shard)))
+        with self._shard_locks.for_stripe(shard):
+            _atomic_write_json(destination, self._read_shard(shard))
+        return destination
+
+    def backup(self, destination_dir: str) -> List[str]:
+        """Back up every shard plus the index into destination_dir, one shard at a time."""
+        paths = [
+            self.backup_shard(shard, destination_dir)
+            for shard in self._existing_shards()
+        ]
+        with self._index_lock:
+            index_backup = os.path.join(destination_dir, self.INDEX_FILE)
+            _atomic_write_json(index_backup, self._read_index())
+        return paths + [index_backup]
+
+    def restore_shard(self, shard: int, backup_file: str) -> int:
+        """
+        Replace one shard with a backup file and index the users it contains.
+
+        Returns:
+            Number of users in the restored shard
+
+        Raises:
+            ValueError: If the backup holds phone numbers that belong to another shard
+        """
+        with open(backup_file, 'rb') as f:
+            users = loads(f.read())
+
+        misplaced = [phone for phone in users if self.shard_for(phone) != shard]
+        if misplaced:
+            raise ValueError(f"{backup_file} contains users from other shards: {misplaced[:5]}")
+
+        with self._shard_locks.for_stripe(shard):
+            _atomic_write_json(self.shard_path(shard), users)
+        self._index_users({phone: shard for phone in users})
+        return len(users)
+
+
+def create_store(
+    backend: str,
+    data_file: str,
+    lock_file: str,
+    db_file: str,
+    lock_timeout: float = 30.0,
+    lock_stripes: int = 64,
+    shard_dir: str = "user_data_shards",
+    shard_count: int = 256
+):
+    """
+    Create the storage backend named by backend.
+
+    Args:
+        backend: "sqlite", "sharded" or "json"
+        data_file: JSON data file (used by the json backend and imported by the others on first run)
+        lock_file: Lock file for the json backend
+        db_file: SQLite database file for the sqlite backend
+        lock_timeout: Seconds to wait for the store's write lock before failing
+        lock_stripes: Number of per-user lock stripes for the sqlite backend
+        shard_dir: Directory of shard files for the sharded backend
+        shard_count: Number of shard files for a new sharded layout
+    """
+    if backend == "sqlite":
+        return SQLiteStore(
+            db_file, busy_timeout=lock_timeout, import_json_file=data_file, lock_stripes=lock_stripes
+        )
+    if backend == "sharded":
+        return ShardedFileStore(
+            shard_dir, shard_count=shard_count, lock_timeout=lock_timeout, import_json_file=data_file
+        )
+    if backend == "json":
+        return JSONFileStore(data_file, lock_file, lock_timeout=lock_timeout)
+    raise ValueError(f"Unknown user data backend: {backend}")
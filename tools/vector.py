@@ -3,25 +3,173 @@ Vector Database Operations for KDM Document Search
 
 This module provides async functions for interacting with Qdrant vector database,
 including collection management, embedding generation, and similarity search.
+Searches and writes go through a pluggable vector store backend: the remote
+Qdrant collection (default) or a local in-process NumPy index.
 """
 
 import asyncio
 import aiohttp
+import hashlib
 import json
+import os
+import time
 from typing import List, Dict, Any, Optional
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client.models import (
+    Distance,
+    VectorParams,
+    PointStruct,
+    ScoredPoint,
+    Filter,
+    FieldCondition,
+    MatchValue,
+    MatchAny,
+    PayloadSchemaType
+)
 from qdrant_client.http.exceptions import UnexpectedResponse
 
 # Import configuration
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
-from config import qdrant_client, EMBEDDING_CONFIG
+from config import (
+    qdrant_client,
+    EMBEDDING_CONFIG,
+    EMBEDDING_CACHE_CONFIG,
+    INGESTION_CONFIG,
+    SEARCH_CACHE_CONFIG,
+    VECTOR_STORE_CONFIG
+)
+from .cache import EmbeddingCache
+from .local_index import LocalVectorIndex
 
 # Constants
 COLLECTION_NAME = "kdmcollection"
 DISTANCE_METRIC = Distance.COSINE
 
+# Payload fields that can be used as structured search filters
+FILTERABLE_FIELDS = ("level", "type", "course_name")
+
+
+class EmbeddingClient:
+    """
+    Long-lived HTTP client for the embedding API.
+    
+    Keeps a single aiohttp session with a pooled, keep-alive connector so that
+    repeated embedding calls reuse open TCP/TLS connections instead of paying a
+    full handshake per request.
+    """
+    
+    def __init__(self, pool_size: int = None, keepalive_timeout: float = None):
+        self.pool_size = pool_size or EMBEDDING_CONFIG["pool_size"]
+        self.keepalive_timeout = keepalive_timeout or EMBEDDING_CONFIG["keepalive_timeout"]
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled session, creating it on first use or after the owning loop changed."""
+        loop = asyncio.get_running_loop()
+        
+        if self._session is not None and not self._session.closed and self._loop is loop:
+            return self._session
+        
+        # A session is bound to the loop it was created on; if that loop is gone
+        # (e.g. a previous asyncio.run call) the old session cannot be reused.
+        if self._session is not None and not self._session.closed and self._loop is not None and not self._loop.is_closed():
+            try:
+                await self._session.close()
+            except Exception:
+                pass  # Best effort cleanup of a session from another loop
+        
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=EMBEDDING_CONFIG["timeout"]),
+            headers={"Content-Type": "application/json"}
+        )
+        self._loop = loop
+        return self._session
+    
+    async def close(self) -> None:
+        """Close the pooled session and release its connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+
+# Shared embedding client used by search, single-chunk inserts and ingestion
+_embedding_client = EmbeddingClient()
+
+
+async def close_embedding_client() -> None:
+    """Close the shared embedding client. Call this on application or script shutdown."""
+    await _embedding_client.close()
+
+
+# Query embedding cache so repeated searches skip the remote embedding call
+_embedding_cache = EmbeddingCache(
+    model=EMBEDDING_CONFIG["model"],
+    max_entries=EMBEDDING_CACHE_CONFIG["max_entries"],
+    ttl_seconds=EMBEDDING_CACHE_CONFIG["ttl_seconds"],
+    persist_path=EMBEDDING_CACHE_CONFIG["persist_path"]
+) if EMBEDDING_CACHE_CONFIG["enabled"] else None
+
+
+def get_embedding_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters for the query embedding cache."""
+    if _embedding_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **_embedding_cache.stats()}
+
+
+# Once-per-process collection bootstrap state
+_collection_ready = False
+_collection_lock: Optional[asyncio.Lock] = None
+_collection_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+_last_bootstrap_failure = 0.0
+BOOTSTRAP_RETRY_SECONDS = 30  # Wait before retrying a failed bootstrap
+
+# Bumped in-process on every write; the version file carries writes from other processes
+_local_collection_version = 0
+
+
+def get_collection_version() -> tuple:
+    """
+    Return a token that changes whenever the collection contents change.
+    
+    Combines an in-process write counter with the modification stamp of the
+    shared version file that ingestion rewrites, so caches keyed on it are
+    invalidated by writes from this or any other process.
+    """
+    try:
+        stat = os.stat(SEARCH_CACHE_CONFIG["version_file"])
+        file_version = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        file_version = None
+    return (_local_collection_version, file_version)
+
+
+def bump_collection_version() -> None:
+    """Mark the collection as changed so dependent caches are invalidated."""
+    global _local_collection_version
+    _local_collection_version += 1
+    
+    version_file = SEARCH_CACHE_CONFIG["version_file"]
+    try:
+        try:
+            with open(version_file, 'r') as f:
+                counter = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            counter = 0
+        with open(version_file, 'w') as f:
+            f.write(str(counter + 1))
+    except OSError as e:
+        print(f"Warning: Could not update collection version file: {e}")
+
 
 async def initialize_collection() -> bool:
     """
@@ -37,18 +185,18 @@ async def initialize_collection() -> bool:
         
         if COLLECTION_NAME in existing_collections:
             print(f"Collection '{COLLECTION_NAME}' already exists")
-            return True
-            
-        # Create new collection
-        await qdrant_client.create_collection(
-            collection_name=COLLECTION_NAME,
-            vectors_config=VectorParams(
-                size=EMBEDDING_CONFIG["dimensions"],
-                distance=DISTANCE_METRIC
+        else:
+            # Create new collection
+            await qdrant_client.create_collection(
+                collection_name=COLLECTION_NAME,
+                vectors_config=VectorParams(
+                    size=EMBEDDING_CONFIG["dimensions"],
+                    distance=DISTANCE_METRIC
+                )
             )
-        )
+            print(f"Collection '{COLLECTION_NAME}' created successfully")
         
-        print(f"Collection '{COLLECTION_NAME}' created successfully")
+        await _ensure_payload_indexes()
         return True
         
     except UnexpectedResponse as e:
@@ -59,17 +207,253 @@ async def initialize_collection() -> bool:
         return False
 
 
-async def generate_embedding(text: str) -> Optional[List[float]]:
+def load_snapshot(path: Optional[str] = None) -> Optional[LocalVectorIndex]:
     """
-    Generate embedding for the given text using DeepInfra BGE model.
+    Memory-map the collection snapshot written by data/ingest_documents.py.
     
     Args:
-        text: Text to generate embedding for
+        path: Snapshot directory (default: VECTOR_STORE_CONFIG["snapshot_path"])
         
     Returns:
-        List[float]: Embedding vector or None on error
+        LocalVectorIndex over the snapshot, or None if no usable snapshot exists
     """
-    if not text.strip():
+    path = path or VECTOR_STORE_CONFIG["snapshot_path"]
+    if not path or not LocalVectorIndex.exists(path):
+        return None
+    
+    try:
+        index = LocalVectorIndex.load(path, EMBEDDING_CONFIG["dimensions"], mmap=True)
+        print(f"Loaded collection snapshot with {len(index)} vectors from {path}")
+        return index
+    except Exception as e:
+        print(f"Could not load collection snapshot from {path}: {e}")
+        return None
+
+
+def save_snapshot(index: LocalVectorIndex, path: Optional[str] = None, dtype: Optional[str] = None) -> None:
+    """
+    Write a compact binary snapshot of the collection (.npy vectors plus payload index).
+    
+    Args:
+        index: Index holding the collection's vectors and payloads
+        path: Snapshot directory (default: VECTOR_STORE_CONFIG["snapshot_path"])
+        dtype: Vector storage dtype (default: VECTOR_STORE_CONFIG["snapshot_dtype"])
+    """
+    path = path or VECTOR_STORE_CONFIG["snapshot_path"]
+    index.save(path, dtype=dtype or VECTOR_STORE_CONFIG["snapshot_dtype"])
+    print(f"Saved collection snapshot with {len(index)} vectors to {path}")
+
+
+async def _ensure_payload_indexes() -> None:
+    """Create keyword payload indexes for the filterable fields (no-op if they exist)."""
+    for field_name in FILTERABLE_FIELDS:
+        try:
+            await qdrant_client.create_payload_index(
+                collection_name=COLLECTION_NAME,
+                field_name=field_name,
+                field_schema=PayloadSchemaType.KEYWORD
+            )
+        except Exception as e:
+            # Filtering still works without the index, just slower
+            print(f"Could not create payload index for '{field_name}': {e}")
+
+
+def _build_qdrant_filter(filters: Optional[Dict[str, Any]]) -> Optional[Filter]:
+    """Translate {field: value or [values]} conditions into a Qdrant payload filter."""
+    if not filters:
+        return None
+    
+    conditions = []
+    for key, value in filters.items():
+        if isinstance(value, (list, tuple, set)):
+            conditions.append(FieldCondition(key=key, match=MatchAny(any=list(value))))
+        else:
+            conditions.append(FieldCondition(key=key, match=MatchValue(value=value)))
+    return Filter(must=conditions)
+
+
+class QdrantVectorStore:
+    """
+    Vector store backend backed by the remote Qdrant collection.
+    
+    When a local snapshot is available, searches that take longer than
+    fallback_timeout or fail are answered from the snapshot instead.
+    """
+    
+    name = "qdrant"
+    
+    def __init__(self, snapshot: Optional[LocalVectorIndex] = None, fallback_timeout: Optional[float] = None):
+        self.snapshot = snapshot
+        self.fallback_timeout = fallback_timeout
+    
+    async def initialize(self) -> bool:
+        return await initialize_collection()
+    
+    async def search(
+        self,
+        query_vector: List[float],
+        limit: int,
+        score_threshold: Optional[float],
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[ScoredPoint]:
+        search = qdrant_client.search(
+            collection_name=COLLECTION_NAME,
+            query_vector=query_vector,
+            query_filter=_build_qdrant_filter(filters),
+            limit=limit,
+            score_threshold=score_threshold
+        )
+        if self.snapshot is None:
+            return await search
+        
+        try:
+            return await asyncio.wait_for(search, timeout=self.fallback_timeout)
+        except Exception as e:
+            if isinstance(e, UnexpectedResponse) and e.status_code == 404:
+                mark_collection_unready()
+            reason = "timed out" if isinstance(e, asyncio.TimeoutError) else f"failed ({e})"
+            print(f"Qdrant search {reason}, answering from local snapshot")
+            return [
+                ScoredPoint(id=point_id, version=0, score=score, payload=payload)
+                for point_id, score, payload in self.snapshot.search(query_vector, limit, score_threshold, filters)
+            ]
+    
+    async def upsert(self, points: List[PointStruct]) -> None:
+        await qdrant_client.upsert(
+            collection_name=COLLECTION_NAME,
+            points=points
+        )
+    
+    async def count(self) -> Optional[int]:
+        result = await qdrant_client.count(collection_name=COLLECTION_NAME)
+        return result.count
+
+
+class LocalVectorStore:
+    """
+    Vector store backend backed by an in-process NumPy index.
+    
+    Searches are exact cosine similarity with no network hop. When an index path
+    is configured the index is loaded (memory-mapped) from it at startup and
+    saved back after every write. Without a saved index, the collection
+    snapshot is used as the starting point.
+    """
+    
+    name = "local"
+    
+    def __init__(self, path: Optional[str] = None, mmap: bool = True):
+        self.path = path
+        dimensions = EMBEDDING_CONFIG["dimensions"]
+        if path and LocalVectorIndex.exists(path):
+            self.index = LocalVectorIndex.load(path, dimensions, mmap=mmap)
+            print(f"Loaded local vector index with {len(self.index)} vectors from {path}")
+        else:
+            self.index = load_snapshot() or LocalVectorIndex(dimensions)
+    
+    async def initialize(self) -> bool:
+        return True
+    
+    async def search(
+        self,
+        query_vector: List[float],
+        limit: int,
+        score_threshold: Optional[float],
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[ScoredPoint]:
+        return [
+            ScoredPoint(id=point_id, version=0, score=score, payload=payload)
+            for point_id, score, payload in self.index.search(query_vector, limit, score_threshold, filters)
+        ]
+    
+    async def upsert(self, points: List[PointStruct]) -> None:
+        self.index.upsert(
+            [point.id for point in points],
+            [point.vector for point in points],
+            [point.payload for point in points]
+        )
+        if self.path:
+            self.index.save(self.path)
+    
+    async def count(self) -> Optional[int]:
+        return len(self.index)
+
+
+_vector_store = None
+
+
+def get_vector_store():
+    """Return the vector store backend selected by VECTOR_STORE_CONFIG["backend"]."""
+    global _vector_store
+    if _vector_store is None:
+        backend = VECTOR_STORE_CONFIG["backend"]
+        if backend == "local":
+            _vector_store = LocalVectorStore(
+                path=VECTOR_STORE_CONFIG["local_index_path"],
+                mmap=VECTOR_STORE_CONFIG["mmap"]
+            )
+        elif backend == "qdrant":
+            _vector_store = QdrantVectorStore(
+                snapshot=load_snapshot(),
+                fallback_timeout=VECTOR_STORE_CONFIG["fallback_timeout"]
+            )
+        else:
+            raise ValueError(f"Unknown vector store backend: {backend}")
+    return _vector_store
+
+
+def _get_collection_lock() -> asyncio.Lock:
+    """Return the bootstrap lock for the running event loop."""
+    global _collection_lock, _collection_lock_loop
+    loop = asyncio.get_running_loop()
+    if _collection_lock is None or _collection_lock_loop is not loop:
+        _collection_lock = asyncio.Lock()
+        _collection_lock_loop = loop
+    return _collection_lock
+
+
+async def ensure_collection() -> bool:
+    """
+    Make sure the vector store is ready, contacting Qdrant only once per process.
+    
+    Concurrent first calls wait on a lock so only one of them runs the bootstrap.
+    After a failed bootstrap, callers get False without a network round trip
+    until BOOTSTRAP_RETRY_SECONDS have passed.
+    
+    Returns:
+        bool: True if the collection is ready for searches and writes
+    """
+    global _collection_ready, _last_bootstrap_failure
+    if _collection_ready:
+        return True
+    if time.monotonic() - _last_bootstrap_failure < BOOTSTRAP_RETRY_SECONDS:
+        return False
+    
+    async with _get_collection_lock():
+        if _collection_ready:
+            return True
+        if await get_vector_store().initialize():
+            _collection_ready = True
+        else:
+            _last_bootstrap_failure = time.monotonic()
+    
+    return _collection_ready
+
+
+def is_collection_ready() -> bool:
+    """Return whether the collection bootstrap has succeeded in this process."""
+    return _collection_ready
+
+
+def mark_collection_unready() -> None:
+    """Clear the readiness flag so the next ensure_collection() re-runs the bootstrap."""
+    global _collection_ready, _last_bootstrap_failure
+    _collection_ready = False
+    _last_bootstrap_failure = 0.0
+
+
+def _prepare_embedding_text(text: str) -> Optional[str]:
+    """Validate and truncate text so it fits the embedding model's input limit."""
+    if not text or not text.strip():
         print("Warning: Empty text provided for embedding")
         return None
     
@@ -78,51 +462,65 @@ async def generate_embedding(text: str) -> Optional[List[float]]:
     if len(text) > max_chars:
         text = text[:max_chars].rsplit(' ', 1)[0]  # Cut at word boundary
         print(f"Warning: Text truncated to {len(text)} characters to fit token limit")
-        
+    
+    return text
+
+
+def _extract_embeddings(result: Any) -> Optional[List[List[float]]]:
+    """Extract the list of embedding vectors from a DeepInfra response body."""
+    if isinstance(result, list) and len(result) > 0:
+        # DeepInfra returns a list directly (a single vector or a list of vectors)
+        return result if isinstance(result[0], list) else [result]
+    elif isinstance(result, dict) and result.get("embeddings"):
+        # Alternative format with embeddings key
+        return [
+            item["embedding"] if isinstance(item, dict) and "embedding" in item else item
+            for item in result["embeddings"]
+        ]
+    
+    print(f"Unexpected response format: {result}")
+    return None
+
+
+async def _request_embeddings(inputs: List[str]) -> Optional[List[List[float]]]:
+    """
+    Send one embedding request for a list of already prepared texts.
+    
+    Returns:
+        List of vectors in the same order as inputs, or None if the request failed
+    """
     api_key = EMBEDDING_CONFIG["api_key"]
     if not api_key:
         print("Error: Embedding API key not found")
         return None
     
     headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
+        "Authorization": f"Bearer {api_key}"
     }
     
-    # Fixed payload format - DeepInfra expects "inputs" as an array
+    # DeepInfra expects "inputs" as an array and embeds every element
     payload = {
-        "inputs": [text]
+        "inputs": inputs
     }
     
     try:
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=EMBEDDING_CONFIG["timeout"])) as session:
-            async with session.post(
-                EMBEDDING_CONFIG["api_url"],
-                headers=headers,
-                json=payload
-            ) as response:
-                
-                if response.status == 200:
-                    result = await response.json()
-                    
-                    # Extract embedding from DeepInfra response format
-                    if isinstance(result, list) and len(result) > 0:
-                        # DeepInfra returns a list directly
-                        embedding = result[0] if isinstance(result[0], list) else result
-                        return embedding
-                    elif "embeddings" in result and len(result["embeddings"]) > 0:
-                        # Alternative format with embeddings key
-                        embedding = result["embeddings"][0]
-                        if isinstance(embedding, dict) and "embedding" in embedding:
-                            return embedding["embedding"]
-                        return embedding
-                    else:
-                        print(f"Unexpected response format: {result}")
-                        return None
-                else:
-                    error_text = await response.text()
-                    print(f"Embedding API error {response.status}: {error_text}")
-                    return None
+        session = await _embedding_client.get_session()
+        async with session.post(
+            EMBEDDING_CONFIG["api_url"],
+            headers=headers,
+            json=payload
+        ) as response:
+            
+            if response.status != 200:
+                error_text = await response.text()
+                print(f"Embedding API error {response.status}: {error_text}")
+                return None
+            
+            embeddings = _extract_embeddings(await response.json())
+            if embeddings is not None and len(embeddings) != len(inputs):
+                print(f"Embedding API returned {len(embeddings)} vectors for {len(inputs)} inputs")
+                return None
+            return embeddings
                     
     except asyncio.TimeoutError:
         print("Timeout error while generating embedding")
@@ -135,7 +533,87 @@ async def generate_embedding(text: str) -> Optional[List[float]]:
         return None
 
 
-async def search_similar_chunks(query_text: str, limit: int = 5, score_threshold: float = 0.7) -> List[Dict[str, Any]]:
+async def generate_embedding(text: str) -> Optional[List[float]]:
+    """
+    Generate embedding for the given text using DeepInfra BGE model.
+    
+    Results are served from the query embedding cache when available.
+    
+    Args:
+        text: Text to generate embedding for
+        
+    Returns:
+        List[float]: Embedding vector or None on error
+    """
+    text = _prepare_embedding_text(text)
+    if text is None:
+        return None
+    
+    if _embedding_cache is not None:
+        cached = _embedding_cache.get_embedding(text)
+        if cached is not None:
+            return cached
+    
+    embeddings = await _request_embeddings([text])
+    if not embeddings:
+        return None
+    
+    if _embedding_cache is not None:
+        _embedding_cache.set_embedding(text, embeddings[0])
+    return embeddings[0]
+
+
+async def generate_embeddings(texts: List[str], batch_size: Optional[int] = None) -> List[Optional[List[float]]]:
+    """
+    Generate embeddings for many texts, packing them into batched API requests.
+    
+    Args:
+        texts: Texts to generate embeddings for
+        batch_size: Maximum number of texts per request (default: EMBEDDING_CONFIG["batch_size"])
+        
+    Returns:
+        List with one entry per input text, in input order. An entry is None when
+        that text was empty or could not be embedded.
+    """
+    batch_size = batch_size or EMBEDDING_CONFIG["batch_size"]
+    embeddings: List[Optional[List[float]]] = [None] * len(texts)
+    
+    # Skip empty texts up front so they don't fail the whole batch
+    prepared = []
+    for index, text in enumerate(texts):
+        prepared_text = _prepare_embedding_text(text)
+        if prepared_text is not None:
+            prepared.append((index, prepared_text))
+    
+    async def embed_batch(batch):
+        vectors = await _request_embeddings([text for _, text in batch])
+        if vectors is not None:
+            for (index, _), vector in zip(batch, vectors):
+                embeddings[index] = vector
+            return
+        
+        if len(batch) == 1:
+            return
+        
+        # Batch failed - retry items individually so one bad input only fails itself
+        print(f"Batch of {len(batch)} embeddings failed, retrying items individually")
+        for index, text in batch:
+            single = await _request_embeddings([text])
+            if single:
+                embeddings[index] = single[0]
+    
+    batches = [prepared[i:i + batch_size] for i in range(0, len(prepared), batch_size)]
+    await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    
+    return embeddings
+
+
+async def search_similar_chunks(
+    query_text: str,
+    limit: int = 5,
+    score_threshold: float = 0.7,
+    filters: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
     """
     Search for similar document chunks based on query text.
     
@@ -143,6 +621,8 @@ async def search_similar_chunks(query_text: str, limit: int = 5, score_threshold
         query_text: Text to search for
         limit: Maximum number of results to return
         score_threshold: Minimum similarity score
+        filters: Optional payload conditions on FILTERABLE_FIELDS, e.g.
+            {"type": "financial", "level": ["pg", "general"]} (a list matches any value)
         
     Returns:
         List[Dict]: List of similar chunks with their metadata and scores
@@ -159,12 +639,7 @@ async def search_similar_chunks(query_text: str, limit: int = 5, score_threshold
             return []
         
         # Perform vector search
-        search_results = await qdrant_client.search(
-            collection_name=COLLECTION_NAME,
-            query_vector=query_embedding,
-            limit=limit,
-            score_threshold=score_threshold
-        )
+        search_results = await get_vector_store().search(query_embedding, limit, score_threshold, filters)
         
         # Format results for LLM consumption with all available metadata
         formatted_results = []
@@ -185,13 +660,57 @@ async def search_similar_chunks(query_text: str, limit: int = 5, score_threshold
         
     except UnexpectedResponse as e:
         print(f"Qdrant search error: {e}")
+        if e.status_code == 404:
+            # Collection disappeared (e.g. deleted for a re-index) - bootstrap again
+            mark_collection_unready()
         return []
     except Exception as e:
         print(f"Unexpected error during search: {e}")
         return []
 
 
-async def add_document_chunk(text: str, course_name: str, chunk_id: Optional[str] = None, level: str = "", chunk_type: str = "") -> bool:
+def _point_id(text: str, course_name: str, chunk_id: Optional[str] = None) -> int:
+    """
+    Derive a stable Qdrant point ID for a chunk.
+    
+    Uses a content hash rather than Python's per-process randomised hash(), so
+    re-ingesting the same chunk overwrites its point instead of duplicating it.
+    """
+    key = chunk_id if chunk_id else text + course_name
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return int(digest[:15], 16) % (10**10)  # Positive integer within reasonable range
+
+
+def _build_point(
+    text: str,
+    course_name: str,
+    embedding: List[float],
+    chunk_id: Optional[str] = None,
+    level: str = "",
+    chunk_type: str = ""
+) -> PointStruct:
+    """Create the Qdrant point for a document chunk."""
+    return PointStruct(
+        id=_point_id(text, course_name, chunk_id),
+        vector=embedding,
+        payload={
+            "text": text,
+            "course_name": course_name,
+            "chunk_id": chunk_id,
+            "level": level,
+            "type": chunk_type
+        }
+    )
+
+
+async def add_document_chunk(
+    text: str,
+    course_name: str,
+    chunk_id: Optional[str] = None,
+    level: str = "",
+    chunk_type: str = "",
+    embedding: Optional[List[float]] = None
+) -> bool:
     """
     Add a document chunk to the vector database.
     
@@ -201,6 +720,7 @@ async def add_document_chunk(text: str, course_name: str, chunk_id: Optional[str
         chunk_id: Optional custom ID for the chunk
         level: Course level (ug/pg/general)
         chunk_type: Type of content (overview/fees/requirements/etc.)
+        embedding: Optional precomputed embedding (e.g. from generate_embeddings)
         
     Returns:
         bool: True if successfully added, False on error
@@ -210,38 +730,19 @@ async def add_document_chunk(text: str, course_name: str, chunk_id: Optional[str
         return False
     
     try:
-        # Generate embedding for the text
-        embedding = await generate_embedding(text)
+        # Generate embedding for the text unless one was supplied
+        if embedding is None:
+            embedding = await generate_embedding(text)
         if not embedding:
             print("Failed to generate embedding for document chunk")
             return False
         
-        # Create point for insertion - ensure ID is valid for Qdrant (integer or UUID)
-        if chunk_id:
-            # Convert string chunk_id to integer using hash for consistency
-            point_id = abs(hash(chunk_id)) % (10**10)  # Ensure positive integer within reasonable range
-        else:
-            # Fallback to hashing text + course_name
-            point_id = abs(hash(text + course_name)) % (10**10)
-        
-        point = PointStruct(
-            id=point_id,
-            vector=embedding,
-            payload={
-                "text": text,
-                "course_name": course_name,
-                "chunk_id": chunk_id,
-                "level": level,
-                "type": chunk_type
-            }
-        )
+        point = _build_point(text, course_name, embedding, chunk_id, level, chunk_type)
         
         # Insert into collection
-        await qdrant_client.upsert(
-            collection_name=COLLECTION_NAME,
-            points=[point]
-        )
+        await get_vector_store().upsert([point])
         
+        bump_collection_version()
         print(f"Successfully added document chunk for course: {course_name}")
         return True
         
@@ -250,6 +751,100 @@ async def add_document_chunk(text: str, course_name: str, chunk_id: Optional[str
         return False
 
 
+async def upsert_document_chunks(
+    chunks: List[Dict[str, Any]],
+    upsert_batch_size: Optional[int] = None,
+    embedding_batch_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    mirror: Optional[LocalVectorIndex] = None
+) -> Dict[str, Any]:
+    """
+    Bulk-ingest document chunks: embed in batches and upsert many points per request.
+    
+    Chunks are split into upsert batches which are processed concurrently (bounded
+    by max_concurrency). Each batch embeds its texts with generate_embeddings and
+    writes all resulting points in a single upsert call.
+    
+    Args:
+        chunks: Dicts with "text", "course_name" and optional "chunk_id", "level", "chunk_type"
+        upsert_batch_size: Points per upsert request (default: INGESTION_CONFIG["upsert_batch_size"])
+        embedding_batch_size: Texts per embedding request (default: EMBEDDING_CONFIG["batch_size"])
+        max_concurrency: Batches processed in parallel (default: INGESTION_CONFIG["max_concurrency"])
+        mirror: Optional local index that also receives every stored point (used to build snapshots)
+        
+    Returns:
+        Dict with stored count, failed chunk indexes, per-batch timings and total time
+    """
+    upsert_batch_size = upsert_batch_size or INGESTION_CONFIG["upsert_batch_size"]
+    max_concurrency = max_concurrency or INGESTION_CONFIG["max_concurrency"]
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    result = {
+        "stored": 0,
+        "failed": [],
+        "batches": [],
+        "total_seconds": 0.0
+    }
+    
+    async def process_batch(batch_number: int, offset: int, batch: List[Dict[str, Any]]):
+        async with semaphore:
+            timing = {"batch": batch_number, "size": len(batch), "stored": 0}
+            
+            started = time.perf_counter()
+            embeddings = await generate_embeddings([chunk["text"] for chunk in batch], embedding_batch_size)
+            timing["embed_seconds"] = round(time.perf_counter() - started, 3)
+            
+            points = []
+            point_indexes = []
+            for index, (chunk, embedding) in enumerate(zip(batch, embeddings), start=offset):
+                if embedding is None:
+                    result["failed"].append(index)
+                    continue
+                points.append(_build_point(
+                    chunk["text"],
+                    chunk["course_name"],
+                    embedding,
+                    chunk.get("chunk_id"),
+                    chunk.get("level", ""),
+                    chunk.get("chunk_type", "")
+                ))
+                point_indexes.append(index)
+            
+            started = time.perf_counter()
+            if points:
+                try:
+                    await get_vector_store().upsert(points)
+                    if mirror is not None:
+                        mirror.upsert(
+                            [point.id for point in points],
+                            [point.vector for point in points],
+                            [point.payload for point in points]
+                        )
+                    timing["stored"] = len(points)
+                    result["stored"] += len(points)
+                except Exception as e:
+                    print(f"Error upserting batch {batch_number}: {e}")
+                    timing["error"] = str(e)
+                    result["failed"].extend(point_indexes)
+            timing["upsert_seconds"] = round(time.perf_counter() - started, 3)
+            
+            result["batches"].append(timing)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        process_batch(batch_number, offset, chunks[offset:offset + upsert_batch_size])
+        for batch_number, offset in enumerate(range(0, len(chunks), upsert_batch_size), start=1)
+    ))
+    result["total_seconds"] = round(time.perf_counter() - started, 3)
+    
+    if result["stored"]:
+        bump_collection_version()
+    
+    result["failed"].sort()
+    result["batches"].sort(key=lambda timing: timing["batch"])
+    return result
+
+
 # Health check function
 async def health_check() -> Dict[str, Any]:
     """
@@ -259,26 +854,42 @@ async def health_check() -> Dict[str, Any]:
         Dict: Health status information
     """
     status = {
+        "backend": VECTOR_STORE_CONFIG["backend"],
         "qdrant_connected": False,
         "embedding_api_configured": False,
         "collection_exists": False,
+        "collection_ready": _collection_ready,
         "errors": []
     }
     
-    try:
-        # Check Qdrant connection
-        collections = await qdrant_client.get_collections()
-        status["qdrant_connected"] = True
-        
-        # Check if collection exists
-        existing_collections = [col.name for col in collections.collections]
-        status["collection_exists"] = COLLECTION_NAME in existing_collections
+    if VECTOR_STORE_CONFIG["backend"] == "local":
+        # Local index needs no connection; it "exists" once it holds vectors
+        try:
+            status["vector_count"] = await get_vector_store().count()
+            status["collection_exists"] = status["vector_count"] > 0
+        except Exception as e:
+            status["errors"].append(f"Local vector index error: {e}")
+    else:
+        try:
+            # Check Qdrant connection
+            collections = await qdrant_client.get_collections()
+            status["qdrant_connected"] = True
+            
+            # Check if collection exists
+            existing_collections = [col.name for col in collections.collections]
+            status["collection_exists"] = COLLECTION_NAME in existing_collections
+            if not status["collection_exists"]:
+                mark_collection_unready()
+            
+        except Exception as e:
+            status["errors"].append(f"Qdrant connection error: {e}")
         
-    except Exception as e:
-        status["errors"].append(f"Qdrant connection error: {e}")
+        snapshot = get_vector_store().snapshot
+        status["snapshot_vectors"] = len(snapshot) if snapshot is not None else 0
     
     # Check embedding API configuration
     status["embedding_api_configured"] = bool(EMBEDDING_CONFIG["api_key"])
+    status["embedding_cache"] = get_embedding_cache_stats()
     
     if not status["embedding_api_configured"]:
         status["errors"].append("Embedding API key not configured")
@@ -286,10 +897,7 @@ async def health_check() -> Dict[str, Any]:
     return status
 
 
-# Initialize collection on module import
-async def _initialize_on_startup():
-    """Initialize collection when module is imported."""
-    await initialize_collection()
-
-# Note: In a real application, you'd call this during app startup
-# For now, it's available to be called manually when needed 
\ No newline at end of file
+async def initialize_on_startup():
+    """Load the vector store (and its local snapshot) and bootstrap the collection at app startup."""
+    get_vector_store()
+    await ensure_collection() 
\ No newline at end of file